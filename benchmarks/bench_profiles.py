@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import playwright_interactions
+from browser_pool import process_tree_rss
+from playwright_interactions import LAUNCH_PROFILES, scan_homepage
+
+# ==========================
+# CONFIG
+# ==========================
+
+RSS_SAMPLE_INTERVAL = 0.2  # seconds
+
+
+# ==========================
+# MEASUREMENT
+# ==========================
+
+class PeakRSS:
+    """Samples the RSS of this process and all its children (driver + browsers) in the background."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            rss = process_tree_rss(os.getpid())
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def total_settle_ms(data) -> float:
+    """Sum of every "settle_ms" timing in a scan (page load, hovers, clicks, popup actions)."""
+    if isinstance(data, list):
+        return sum(total_settle_ms(item) for item in data)
+    if not isinstance(data, dict):
+        return 0
+    total = 0
+    for key, value in data.items():
+        if key == "settle_ms" and isinstance(value, dict):
+            total += sum(v for v in value.values() if isinstance(v, (int, float)))
+        else:
+            total += total_settle_ms(value)
+    return total
+
+
+def bench_profile(profile: str, url: str, repeat: int, workers: int) -> dict:
+    """Scan `url` `repeat` times with one launch profile (the scan cache is never used)."""
+    playwright_interactions.LAUNCH_PROFILE = profile
+    times = []
+    settle_ms = []
+    peaks = []
+    interactions = 0
+    for _ in range(repeat):
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            result = scan_homepage(url, workers=workers)
+            times.append(time.perf_counter() - started)
+        if rss.peak is not None:
+            peaks.append(rss.peak)
+        settle_ms.append(total_settle_ms(result))
+        interactions = len(result["hover_interactions"]) + len(result["click_interactions"])
+    return {
+        "profile": profile,
+        "runs": repeat,
+        "mean_s": round(statistics.mean(times), 2),
+        "min_s": round(min(times), 2),
+        "settle_ms": round(statistics.mean(settle_ms)),
+        "peak_rss_mb": round(max(peaks) / (1024 * 1024), 1) if peaks else None,
+        "interactions": interactions,
+    }
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare scan time and memory across browser launch profiles.")
+    parser.add_argument("url")
+    parser.add_argument(
+        "--profiles", nargs="+", choices=sorted(LAUNCH_PROFILES), default=["default", "lean"],
+        help="profiles to compare (default: %(default)s)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="scans per profile (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="click workers per scan (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    results = [bench_profile(profile, args.url, args.repeat, args.workers) for profile in args.profiles]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'profile':<10} {'mean s':>8} {'min s':>8} {'settle ms':>10} {'peak RSS MB':>12} {'interactions':>13}")
+        for r in results:
+            rss = r["peak_rss_mb"] if r["peak_rss_mb"] is not None else "n/a"
+            print(f"{r['profile']:<10} {r['mean_s']:>8} {r['min_s']:>8} {r['settle_ms']:>10} {rss:>12} {r['interactions']:>13}")
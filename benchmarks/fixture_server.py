@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ==========================
+# CONFIG
+# ==========================
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+STUB_LATENCY = 0.3        # seconds before the stub LLM answers
+STUB_CHUNK_DELAY = 0.01   # seconds between streamed lines
+
+# Any fixture path without a file (link targets) gets this page
+DESTINATION_PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title></head>
+<body><h1>{title}</h1><p>Fixture destination page.</p><a href="../">Back</a></body></html>
+"""
+
+
+def fixture_sites() -> list:
+    return sorted(p.name for p in FIXTURES_DIR.iterdir() if (p / "index.html").exists())
+
+
+# ==========================
+# STUB LLM
+# ==========================
+
+def stub_feature(user_message: str) -> str:
+    """
+    Deterministic Gherkin for a generation request: one scenario per
+    trigger in the scan part of the message.
+    """
+    triggers = re.findall(r'"(?:trigger|triggers)"\s*:\s*\[?\s*(?:\{\s*"text"\s*:\s*)?"([^"]+)"', user_message)
+    page = re.search(r'"page_url"\s*:\s*"([^"]+)"', user_message)
+    page_url = page.group(1) if page else "http://localhost/"
+    lines = ["Feature: Fixture page interactions", ""]
+    for trigger in triggers or ["page"]:
+        lines += [
+            f"  Scenario: Interact with {trigger}",
+            f'    Given the user is on the "{page_url}" page',
+            f'    When the user clicks the "{trigger}" button',
+            "    Then the page should respond",
+            "",
+        ]
+    return "\n".join(lines).rstrip() + "\n"
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Static fixture sites plus a Groq-compatible chat completions stub."""
+
+    server_version = "FixtureServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.exists(path) and not self.path.startswith("/openai/"):
+            title = Path(self.path.split("?")[0].rstrip("/")).stem.replace("-", " ").title() or "Fixtures"
+            body = DESTINATION_PAGE.format(title=title).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return _BytesFile(body)
+        return super().send_head()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.llm_requests += 1
+        user_message = next((m["content"] for m in request.get("messages", []) if m["role"] == "user"), "")
+        content = stub_feature(user_message)
+        time.sleep(self.server.latency)
+
+        base = {"id": f"stub-{self.server.llm_requests}", "created": int(time.time()), "model": request.get("model", "stub")}
+        if not request.get("stream"):
+            body = json.dumps({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(user_message) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(user_message) + len(content)) // 4},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        pieces = [line + "\n" for line in content.splitlines()]
+        for i, piece in enumerate(pieces):
+            chunk = {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": piece},
+                             "finish_reason": "stop" if i == len(pieces) - 1 else None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(STUB_CHUNK_DELAY)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class _BytesFile:
+    """File-like body for SimpleHTTPRequestHandler.copyfile()."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self, size: int = -1) -> bytes:
+        data, self.data = self.data, b""
+        return data
+
+    def close(self) -> None:
+        pass
+
+
+# ==========================
+# SERVER
+# ==========================
+
+class FixtureServer:
+    """
+    Fixture sites on http://127.0.0.1:<port>/<site>/ and the stub LLM on
+    http://127.0.0.1:<port>/openai/v1/chat/completions, served from a
+    background thread. Point the Groq client at it with GROQ_BASE_URL
+    (see env()).
+    """
+
+    def __init__(self, port: int = 0, latency: float = STUB_LATENCY):
+        handler = partial(FixtureHandler, directory=str(FIXTURES_DIR))
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.llm_requests = 0
+        self.httpd.lock = threading.Lock()
+        self.httpd.latency = latency
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def llm_requests(self) -> int:
+        return self.httpd.llm_requests
+
+    def url(self, site: str) -> str:
+        return f"{self.base_url}/{site}/"
+
+    def env(self) -> dict:
+        return {"GROQ_BASE_URL": self.base_url, "GROQ_API_KEY": "benchmark-stub"}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixture sites and the stub LLM endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY, help="stub LLM latency in seconds")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with FixtureServer(args.port, args.latency) as server:
+        for site in fixture_sites():
+            print(server.url(site))
+        print(f"Stub LLM: GROQ_BASE_URL={server.base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from jobs import FINISHED_STATES, JobQueue, JobStore
+
+# ==========================
+# CONFIG
+# ==========================
+
+SCAN_PATH = Path(__file__).resolve().parent / "fixtures" / "sample_scan.json"
+JOB_WAIT_SECONDS = 30
+
+
+class FakePool:
+    """BrowserPool stand-in that answers every scan with a stored scan result."""
+
+    def __init__(self, scan: dict):
+        self.scan = scan
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        self.submitted += 1
+        future = Future()
+        future.set_result(json.loads(json.dumps(self.scan)))
+        return future
+
+
+# ==========================
+# CHECK
+# ==========================
+
+def run_job(scan: dict, engine: str) -> tuple:
+    """(finished job, feature file contents or None) for one job run through a fresh JobQueue."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # The output directory does not exist yet: the queue must create it
+        output_dir = os.path.join(tmp, "outputs", "jobs")
+        queue = JobQueue(store=JobStore(os.path.join(tmp, "jobs.sqlite")), browser_pool=FakePool(scan),
+                         workers=1, output_dir=output_dir)
+        try:
+            job = queue.submit(scan["page_url"], engine=engine)
+            deadline = time.time() + JOB_WAIT_SECONDS
+            while time.time() < deadline:
+                job = queue.store.get(job["id"], full=True)
+                if job["status"] in FINISHED_STATES:
+                    break
+                time.sleep(0.1)
+        finally:
+            queue.close()
+        path = os.path.join(output_dir, f"{job['id']}.feature")
+        feature = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                feature = f.read()
+        return job, feature
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run one scan + generate job end to end through the job queue with a fake browser pool."
+    )
+    parser.add_argument("--scan", type=Path, default=SCAN_PATH, help="scan result the fake pool returns (default: %(default)s)")
+    parser.add_argument("--engine", default="rules", help="generation engine (default: %(default)s, no network)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(args.scan, "r", encoding="utf-8") as f:
+        scan = json.load(f)
+
+    # The generator reads its prompt relative to the repository root
+    os.chdir(ROOT)
+    job, feature = run_job(scan, args.engine)
+
+    problems = []
+    if job["status"] != "succeeded":
+        problems.append(f"job ended {job['status']}: {job['error']}")
+    if not feature:
+        problems.append("no feature file written")
+    elif feature != job.get("feature"):
+        problems.append("feature file differs from the stored job feature")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if not problems:
+        print(f"Job {job['id']} succeeded: {feature.count('Scenario:')} scenario(s)")
+    sys.exit(1 if problems else 0)
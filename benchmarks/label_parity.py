@@ -0,0 +1,153 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from playwright.sync_api import sync_playwright
+
+from fixture_server import FixtureServer, fixture_sites
+from playwright_interactions import (
+    SNAPSHOT_LABEL_LENS,
+    launch_browser,
+    resolve_labels,
+    safe_text,
+    snapshot_elements,
+    snapshot_label,
+)
+
+# ==========================
+# CONFIG
+# ==========================
+
+# Elements whose labels the scanner reads
+LABEL_SELECTOR = "a, button, [role='button'], input, nav li, h1, h2, svg, span"
+MAX_LENS = SNAPSHOT_LABEL_LENS
+
+# Edge cases for the label chain: whitespace variants, hidden elements,
+# attribute fallbacks, over-long text and characters outside the BMP
+EDGE_CASES_HTML = """<!DOCTYPE html>
+<html><body>
+<a href="/plain">Plain link</a>
+<a href="/spaces">  Lots\t of \n\n  white space  </a>
+<a href="/nbsp">  Em space　ideographic </a>
+<a href="/bom">﻿Byte order mark</a>
+<a href="/seps">File\x1cseparator\x85next line</a>
+<a href="/empty"></a>
+<a href="/aria" aria-label="  Aria   label "></a>
+<a href="/title" title="Title only"></a>
+<a id="only-id"></a>
+<button aria-label="Close dialog">&times;</button>
+<button title="Has title">   </button>
+<input type="button" value="Input value">
+<input type="text" value="  typed  ">
+<a href="/long">%(long)s</a>
+<a href="/emoji">%(emoji)s</a>
+<a href="/hidden" style="display:none">Hidden link text</a>
+<span style="visibility:hidden">Invisible span</span>
+<nav><ul><li>Menu <b>with</b> <i>markup</i><ul style="display:none"><li><a href="/sub">Sub item</a></li></ul></li></ul></nav>
+<svg width="10" height="10" aria-label="Icon"><title>Svg title</title></svg>
+<span><!-- comment --> <br>  </span>
+</body></html>
+""" % {"long": "x" * 180, "emoji": "\U0001F600" * 120}
+
+
+def legacy_safe_text(el, max_len: int = 200) -> str | None:
+    """The original seven-call label chain, kept as the reference."""
+    for method in [
+        lambda e: e.inner_text(timeout=300),
+        lambda e: e.text_content(timeout=300),
+        lambda e: e.get_attribute("aria-label", timeout=300),
+        lambda e: e.get_attribute("title", timeout=300),
+        lambda e: e.get_attribute("value", timeout=300),
+        lambda e: e.get_attribute("href", timeout=300),
+        lambda e: e.get_attribute("id", timeout=300),
+    ]:
+        try:
+            txt = method(el)
+            if txt:
+                txt = " ".join(txt.split())
+                if 0 < len(txt) <= max_len:
+                    return txt
+        except Exception:
+            continue
+    return None
+
+
+# ==========================
+# PARITY CHECK
+# ==========================
+
+def check_page(page, name: str) -> tuple:
+    """(elements compared, mismatches, legacy seconds, batched seconds) for the loaded page."""
+    locator = page.locator(LABEL_SELECTOR)
+    total = locator.count()
+    mismatches = []
+    legacy_s = batched_s = 0.0
+    for max_len in MAX_LENS:
+        started = time.perf_counter()
+        expected = [legacy_safe_text(locator.nth(i), max_len) for i in range(total)]
+        legacy_s += time.perf_counter() - started
+
+        started = time.perf_counter()
+        batched = resolve_labels(locator, max_len)
+        batched_s += time.perf_counter() - started
+
+        single = [safe_text(locator.nth(i), max_len) for i in range(total)]
+        snapshot = {
+            item["index"]: snapshot_label(item, max_len)
+            for item in snapshot_elements(page, LABEL_SELECTOR)
+        }
+
+        for i in range(total):
+            got = {
+                "resolve_labels": batched[i] if i < len(batched) else "<missing>",
+                "safe_text": single[i],
+            }
+            if i in snapshot:  # snapshots only cover visible elements
+                got["snapshot_label"] = snapshot[i]
+            for source, value in got.items():
+                if value != expected[i]:
+                    mismatches.append((name, i, max_len, source, expected[i], value))
+    return total, mismatches, legacy_s, batched_s
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that the batched label resolver matches the original safe_text() chain."
+    )
+    parser.add_argument("--sites", nargs="+", help="fixture sites to check besides the edge cases (default: all)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sites = args.sites or fixture_sites()
+
+    results = []
+    with FixtureServer() as server, sync_playwright() as p:
+        browser = launch_browser(p)
+        try:
+            page = browser.new_page()
+            page.set_content(EDGE_CASES_HTML)
+            results.append(check_page(page, "edge_cases"))
+            for site in sites:
+                page.goto(server.url(site), wait_until="domcontentloaded")
+                results.append(check_page(page, site))
+        finally:
+            browser.close()
+
+    compared = sum(r[0] for r in results) * len(MAX_LENS)
+    mismatches = [m for r in results for m in r[1]]
+    legacy_s = sum(r[2] for r in results)
+    batched_s = sum(r[3] for r in results)
+    for name, index, max_len, source, expected, got in mismatches:
+        print(f"MISMATCH {name} #{index} max_len={max_len} {source}: expected {expected!r}, got {got!r}")
+    print(f"{compared} labels compared, {len(mismatches)} mismatch(es)")
+    print(f"legacy chain {legacy_s:.2f}s, batched resolver {batched_s:.3f}s")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from bench_profiles import PeakRSS
+from cookie_strategies import CookieStrategies, use_cookie_strategies
+from fixture_server import STUB_LATENCY, FixtureServer, fixture_sites
+from generate_gherkin_with_ai import ENGINES, generate_from_scan
+from playwright_interactions import scan_homepage
+
+# ==========================
+# CONFIG
+# ==========================
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# Allowed growth over the baseline before a metric counts as a regression,
+# as (relative, absolute) slack; timings get an absolute floor for noise.
+REGRESSION_TOLERANCE = {
+    "scan_s": (0.25, 0.5),
+    "generate_s": (0.25, 0.5),
+    "peak_rss_mb": (0.20, 50),
+    "round_trips": (0.10, 5),
+    "contexts": (0.0, 0),
+    "llm_requests": (0.0, 0),
+}
+
+
+# ==========================
+# BENCHMARK
+# ==========================
+
+def bench_site(server: FixtureServer, site: str, engine: str, repeat: int, workers: int, output_dir: str) -> dict:
+    """Scan one fixture site and generate its scenarios `repeat` times; medians of each metric."""
+    url = server.url(site)
+    # All fixture sites share one host:port; a fresh in-memory strategy cache
+    # per site keeps one site's cookie banner from deciding another's probing
+    use_cookie_strategies(CookieStrategies(path=None))
+    runs = []
+    for _ in range(repeat):
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            scan = scan_homepage(url, workers=workers)
+            scan_s = time.perf_counter() - started
+
+        requests_before = server.llm_requests
+        started = time.perf_counter()
+        feature = generate_from_scan(scan, engine=engine, output_path=os.path.join(output_dir, f"{site}.feature"))
+        generate_s = time.perf_counter() - started
+
+        metrics = scan.get("metrics", {})
+        runs.append({
+            "scan_s": scan_s,
+            "generate_s": generate_s,
+            "peak_rss_mb": rss.peak / (1024 * 1024) if rss.peak is not None else None,
+            "round_trips": metrics.get("round_trips", {}).get("total"),
+            "contexts": metrics.get("counters", {}).get("contexts"),
+            "llm_requests": server.llm_requests - requests_before,
+            "interactions": len(scan["hover_interactions"]) + len(scan["click_interactions"]),
+            "scenarios": (feature or "").count("Scenario:"),
+        })
+
+    result = {"site": site, "runs": repeat}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        result[key] = round(statistics.median(values), 2) if values else None
+    return result
+
+
+def find_regressions(results: list, baseline: dict) -> list:
+    """(site, metric, baseline value, current value) for every metric past its tolerance."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result["site"])
+        if not base:
+            continue
+        for metric, (relative, absolute) in REGRESSION_TOLERANCE.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + relative) + absolute:
+                regressions.append((result["site"], metric, old, new))
+    return regressions
+
+
+def load_baseline(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: Path, results: list) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({r["site"]: r for r in results}, f, indent=2)
+        f.write("\n")
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scanner and generator on local fixture sites with a stub LLM."
+    )
+    parser.add_argument("--sites", nargs="+", help="fixture sites to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per site, medians are reported (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="click workers per scan (default: %(default)s)")
+    parser.add_argument("--engine", choices=ENGINES, default="llm",
+                        help="generation engine (default: %(default)s, so every scan goes through the stub)")
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY,
+                        help="stub LLM latency in seconds (default: %(default)s)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sites = args.sites or fixture_sites()
+
+    # The generator reads its prompt relative to the repository root
+    os.chdir(ROOT)
+    with FixtureServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as output_dir:
+        os.environ.update(server.env())
+        os.environ["LLM_CACHE"] = "0"
+        results = [bench_site(server, site, args.engine, args.repeat, args.workers, output_dir) for site in sites]
+
+    baseline = load_baseline(args.baseline)
+    regressions = find_regressions(results, baseline)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        columns = ("scan_s", "generate_s", "peak_rss_mb", "round_trips", "contexts", "llm_requests", "interactions", "scenarios")
+        print(f"{'site':<14}" + "".join(f"{c:>14}" for c in columns))
+        for r in results:
+            print(f"{r['site']:<14}" + "".join(f"{str(r[c]):>14}" for c in columns))
+        if not baseline:
+            print(f"\nNo baseline at {args.baseline} (run with --save-baseline to create one)")
+        for site, metric, old, new in regressions:
+            print(f"REGRESSION {site} {metric}: {old} -> {new}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    sys.exit(1 if regressions else 0)
@@ -1,4 +1,9 @@
-from flask import Flask
+from flask import Flask, Response, jsonify, request, url_for
+
+from browser_pool import get_pool
+from generate_gherkin_with_ai import DEFAULT_ENGINE
+from jobs import QueueFull, get_job_queue
+from pipeline import scan_page
 
 app = Flask(__name__)
 
@@ -6,5 +11,111 @@ app = Flask(__name__)
 def hello():
     return "Hello, World!"
 
+@app.route("/pool")
+def pool_stats():
+    """Health and utilization of the shared browser pool"""
+    stats = get_pool().stats()
+    return jsonify(stats), 200 if stats["healthy"] else 503
+
+@app.route("/scan", methods=["POST"])
+def scan():
+    """Scan the posted {"url": ..., "refresh": false} on a warm pooled browser"""
+    body = request.get_json(silent=True) or {}
+    url = body.get("url", "")
+    if not url.startswith(("http://", "https://")):
+        return jsonify({"error": "url must start with http:// or https://"}), 400
+    try:
+        result = scan_page(url, refresh=bool(body.get("refresh")), browser_pool=get_pool())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result)
+
+def _job_json(job):
+    """Job status with links to its endpoints"""
+    job = dict(job)
+    job["links"] = {
+        "self": url_for("job_status", job_id=job["id"]),
+        "result": url_for("job_result", job_id=job["id"]),
+        "feature": url_for("job_feature", job_id=job["id"]),
+        "cancel": url_for("job_cancel", job_id=job["id"]),
+    }
+    return job
+
+@app.route("/jobs", methods=["POST"])
+def submit_jobs():
+    """
+    Queue scan + generate jobs: {"url": ...} or {"urls": [...]}, plus optional
+    "engine" (rules|llm|hybrid), "refresh" and "timeout" (seconds)
+    """
+    body = request.get_json(silent=True) or {}
+    urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+    if not urls or not all(isinstance(u, str) and u.startswith(("http://", "https://")) for u in urls):
+        return jsonify({"error": "url(s) must start with http:// or https://"}), 400
+    timeout = body.get("timeout")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        return jsonify({"error": "timeout must be a positive number of seconds"}), 400
+    jobs = []
+    try:
+        for url in urls:
+            jobs.append(get_job_queue().submit(
+                url,
+                engine=body.get("engine", DEFAULT_ENGINE),
+                refresh=bool(body.get("refresh")),
+                timeout=timeout,
+            ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        # the jobs accepted before the queue filled up still run
+        return jsonify({"error": f"job queue is full ({e})", "jobs": [_job_json(j) for j in jobs]}), 503
+    if "urls" in body:
+        return jsonify({"jobs": [_job_json(j) for j in jobs]}), 202
+    return jsonify(_job_json(jobs[0])), 202
+
+@app.route("/jobs")
+def list_jobs():
+    """Most recent jobs, optionally ?status=queued|running|succeeded|failed|cancelled|timed_out"""
+    queue = get_job_queue()
+    jobs = queue.store.list(request.args.get("status"), request.args.get("limit", 100, type=int))
+    return jsonify({"queue": queue.stats(), "jobs": [_job_json(j) for j in jobs]})
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Status and progress of one job"""
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(_job_json(job))
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    """Scan result and feature text of a finished job"""
+    job = get_job_queue().store.get(job_id, full=True)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"error": f"job is {job['status']}", "status": job["status"]}), 409
+    return jsonify(_job_json(job))
+
+@app.route("/jobs/<job_id>/feature")
+def job_feature(job_id):
+    """Generated feature file of a succeeded job, as text"""
+    job = get_job_queue().store.get(job_id, full=True)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    if not job["feature"]:
+        return jsonify({"error": f"no feature file (job is {job['status']})", "status": job["status"]}), 409
+    return Response(job["feature"], mimetype="text/plain",
+                    headers={"Content-Disposition": f'attachment; filename="{job_id}.feature"'})
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def job_cancel(job_id):
+    """Cancel a queued or running job"""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(_job_json(job))
+
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    # threaded: concurrent requests share the pool's warm browsers
+    app.run(threaded=True)
@@ -0,0 +1,320 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+
+from playwright_interactions import launch_browser, safe_print
+
+# ==========================
+# CONFIG
+# ==========================
+
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))   # warm browsers
+POOL_MAX_USES = 50          # jobs per browser before it is recycled
+POOL_RSS_GROWTH = 2.5       # recycle when the browser's RSS exceeds this x its warm baseline
+POOL_MAX_RSS_MB = 2048      # ... or this absolute size
+
+# Driver processes are found by diffing our child processes, so slots start one at a time
+_START_LOCK = threading.Lock()
+
+
+# ==========================
+# PROCESS MEMORY
+# ==========================
+
+def _children_map() -> dict:
+    """parent pid -> [child pids] of every process (Linux /proc only; empty elsewhere)."""
+    children = {}
+    try:
+        pids = [int(d) for d in os.listdir("/proc") if d.isdigit()]
+    except OSError:
+        return children
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                # the command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def _child_pids(pid: int) -> set:
+    return set(_children_map().get(pid, []))
+
+
+def process_tree_rss(pid: int) -> int | None:
+    """Resident memory in bytes of `pid` and all its descendants, None if unavailable."""
+    children = _children_map()
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    total = 0
+    found = False
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+            found = True
+        except (OSError, ValueError, IndexError):
+            continue
+        stack.extend(children.get(current, []))
+    return total if found else None
+
+
+# ==========================
+# BROWSER POOL
+# ==========================
+
+class _Slot:
+    """Bookkeeping of one pool thread and its browser."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.state = "starting"
+        self.uses = 0
+        self.launches = 0
+        self.jobs = 0
+        self.busy_s = 0.0
+        self.driver_pids = set()
+        self.baseline_rss = None
+        self.rss = None
+        self.last_error = None
+        self.connected = False
+
+    def measure(self) -> int | None:
+        sizes = [process_tree_rss(pid) for pid in self.driver_pids]
+        sizes = [s for s in sizes if s is not None]
+        self.rss = sum(sizes) if sizes else None
+        return self.rss
+
+
+class BrowserPool:
+    """
+    Long-lived pool of warm Chromium browsers shared by the web UI, the
+    command-line tools and the Flask app. Browsers follow the scanner's
+    LAUNCH_PROFILE (headless unless `headless` says otherwise).
+
+    The sync Playwright API must be used from the thread that started it,
+    so each slot is a thread owning its own driver and browser; jobs are
+    fn(browser) callables taken from one shared queue by whichever slot is
+    free, and callers on any thread get a Future. Each slot keeps a blank
+    context open so the browser's renderer stays warm between scans, and
+    replaces its browser after POOL_MAX_USES jobs, when the browser's
+    process tree grows past POOL_RSS_GROWTH x its warm size (or
+    POOL_MAX_RSS_MB), or when it disconnects.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, headless: bool | None = None, max_uses: int = POOL_MAX_USES,
+                 rss_growth: float = POOL_RSS_GROWTH, max_rss_mb: int = POOL_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_uses = max_uses
+        self.rss_growth = rss_growth
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.recycled = 0
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._alive = self.size   # slot threads still taking jobs
+        self._slots = [_Slot(i) for i in range(self.size)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(slot,), name=f"browser-pool-{slot.index}", daemon=True)
+            for slot in self._slots
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ---- slot thread ----
+
+    def _launch(self, p, slot: _Slot):
+        browser = launch_browser(p, headless=self.headless)
+        warm = browser.new_context()
+        warm.new_page()
+        slot.launches += 1
+        slot.uses = 0
+        slot.connected = True
+        slot.baseline_rss = slot.measure()
+        return browser
+
+    def _needs_recycle(self, browser, slot: _Slot) -> str | None:
+        if not browser.is_connected():
+            return "disconnected"
+        if slot.uses >= self.max_uses:
+            return f"{slot.uses} uses"
+        rss = slot.measure()
+        if rss is not None and (rss > self.max_rss or (slot.baseline_rss and rss > slot.baseline_rss * self.rss_growth)):
+            return f"RSS {rss // (1024 * 1024)} MB"
+        return None
+
+    def _run(self, slot: _Slot) -> None:
+        p = browser = None
+        try:
+            try:
+                with _START_LOCK:
+                    before = _child_pids(os.getpid())
+                    p = sync_playwright().start()
+                    slot.driver_pids = _child_pids(os.getpid()) - before
+            except Exception as e:
+                slot.state = "failed"
+                slot.last_error = str(e)
+                safe_print(f"[browser-pool] Slot {slot.index} could not start Playwright: {e}")
+                return
+            while True:
+                if browser is None:
+                    slot.state = "starting"
+                    try:
+                        browser = self._launch(p, slot)
+                    except Exception as e:
+                        slot.last_error = str(e)
+                        slot.connected = False
+                        safe_print(f"[browser-pool] Slot {slot.index} could not launch a browser: {e}")
+                slot.state = "idle" if browser is not None else "failed"
+
+                job = self._jobs.get()
+                if job is None:
+                    break
+                future, fn, args, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if browser is None:
+                    future.set_exception(RuntimeError(f"No browser available: {slot.last_error}"))
+                    continue
+
+                slot.state = "busy"
+                started = time.perf_counter()
+                try:
+                    future.set_result(fn(browser, *args, **kwargs))
+                    ok = True
+                except BaseException as e:
+                    slot.last_error = str(e)
+                    future.set_exception(e)
+                    ok = False
+                with self._lock:
+                    slot.busy_s += time.perf_counter() - started
+                    slot.uses += 1
+                    slot.jobs += 1
+                    self.completed += ok
+                    self.failed += not ok
+
+                reason = self._needs_recycle(browser, slot)
+                if reason:
+                    safe_print(f"[browser-pool] Recycling slot {slot.index} browser ({reason})")
+                    slot.state = "recycling"
+                    self._close(browser)
+                    browser = None
+                    with self._lock:
+                        self.recycled += 1
+        finally:
+            if p is not None:
+                slot.state = "stopped"
+            slot.connected = False
+            self._close(browser)
+            if p is not None:
+                p.stop()
+            self._slot_exited(slot)
+
+    def _slot_exited(self, slot: _Slot) -> None:
+        """Once no slot is left, fail the queued jobs instead of leaving their futures pending."""
+        with self._lock:
+            self._alive -= 1
+            if self._alive > 0:
+                return
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job[0].set_running_or_notify_cancel():
+                    job[0].set_exception(self._no_slots_error())
+
+    def _no_slots_error(self) -> RuntimeError:
+        errors = "; ".join(s.last_error for s in self._slots if s.last_error)
+        return RuntimeError(f"Browser pool has no running slots{': ' + errors if errors else ''}")
+
+    @staticmethod
+    def _close(browser) -> None:
+        if browser is None:
+            return
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+    # ---- public API ----
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Run fn(browser, *args, **kwargs) on the next free browser. If every
+        slot has stopped (e.g. Playwright could not start) the future fails
+        right away.
+        """
+        future = Future()
+        with self._lock:
+            if self._alive > 0:
+                self._jobs.put((future, fn, args, kwargs))
+                return future
+        future.set_exception(self._no_slots_error())
+        return future
+
+    def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def healthy(self) -> bool:
+        return all(thread.is_alive() for thread in self._threads) and any(s.connected for s in self._slots)
+
+    def stats(self) -> dict:
+        uptime = time.time() - self.started
+        with self._lock:
+            slots = [
+                {
+                    "slot": s.index,
+                    "state": s.state,
+                    "connected": s.connected,
+                    "uses": s.uses,
+                    "jobs": s.jobs,
+                    "launches": s.launches,
+                    "rss_mb": round(s.rss / (1024 * 1024), 1) if s.rss is not None else None,
+                    "busy_s": round(s.busy_s, 1),
+                    "last_error": s.last_error,
+                }
+                for s in self._slots
+            ]
+            busy_s = sum(s.busy_s for s in self._slots)
+            return {
+                "healthy": self.healthy(),
+                "size": self.size,
+                "busy": sum(s["state"] == "busy" for s in slots),
+                "queued": self._jobs.qsize(),
+                "completed": self.completed,
+                "failed": self.failed,
+                "recycled": self.recycled,
+                "uptime_s": round(uptime, 1),
+                "utilization": round(busy_s / (uptime * self.size), 3) if uptime else 0.0,
+                "slots": slots,
+            }
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(size: int = POOL_SIZE) -> BrowserPool:
+    """The process-wide pool, created on first use."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = BrowserPool(size)
+        return _POOL
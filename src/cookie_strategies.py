@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+
+# ==========================
+# CONFIG
+# ==========================
+
+COOKIE_STRATEGY_PATH = "data/cookie_strategies.json"
+COOKIE_STRATEGY_TTL = 7 * 24 * 60 * 60   # seconds; sites change their consent tools
+
+
+# ==========================
+# STRATEGY CACHE
+# ==========================
+
+class CookieStrategies:
+    """
+    How each domain's (host:port) cookie banner was dismissed, persisted as JSON so
+    later contexts and scans replay it instead of probing again. A strategy
+    is {"kind": "role", "name": button name}, {"kind": "selector",
+    "selector": css} or {"kind": "none"} for a domain without a banner.
+    Safe to share across click-worker threads.
+    """
+
+    def __init__(self, path: str | None = COOKIE_STRATEGY_PATH, ttl: float = COOKIE_STRATEGY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def get(self, domain: str) -> dict | None:
+        """The live strategy recorded for `domain`, or None."""
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None or time.time() - entry.get("updated", 0) > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {k: v for k, v in entry.items() if k != "updated"}
+
+    def record(self, domain: str, strategy: dict) -> None:
+        with self._lock:
+            current = self._entries.get(domain)
+            if current is not None and {k: v for k, v in current.items() if k != "updated"} == strategy \
+                    and time.time() - current.get("updated", 0) < self.ttl / 2:
+                return
+            self._entries[domain] = {**strategy, "updated": time.time()}
+            self._save()
+
+    def forget(self, domain: str) -> None:
+        with self._lock:
+            if self._entries.pop(domain, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        """Write the file atomically (call with the lock held)."""
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"domains": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_STRATEGIES = None
+_STRATEGIES_LOCK = threading.Lock()
+
+
+def get_cookie_strategies() -> CookieStrategies:
+    """The process-wide strategy cache, loaded on first use."""
+    global _STRATEGIES
+    with _STRATEGIES_LOCK:
+        if _STRATEGIES is None:
+            _STRATEGIES = CookieStrategies()
+        return _STRATEGIES
+
+
+def use_cookie_strategies(strategies: CookieStrategies) -> None:
+    """Replace the process-wide strategy cache (e.g. with an in-memory one)."""
+    global _STRATEGIES
+    with _STRATEGIES_LOCK:
+        _STRATEGIES = strategies
@@ -0,0 +1,182 @@
+import argparse
+import json
+from urllib.parse import urlparse
+
+from browser_pool import BrowserPool
+from http_cache import same_origin
+from playwright_interactions import (
+    CLICK_WORKERS,
+    canonicalize_url,
+    safe_print,
+    same_page_path,
+    scan_homepage,
+)
+from template_index import TemplateIndex
+
+# ==========================
+# CONFIG
+# ==========================
+
+CRAWL_MAX_DEPTH = 2     # start page is depth 0
+CRAWL_MAX_PAGES = 25    # page budget for the whole crawl
+CRAWL_WORKERS = 2       # pages scanned in parallel (one browser each)
+
+# Links to files that are not pages
+SKIP_EXTENSIONS = (
+    ".pdf", ".zip", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
+    ".mp4", ".mp3", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+)
+
+
+# ==========================
+# LINK EXTRACTION
+# ==========================
+
+def extract_targets(scan: dict) -> list:
+    """
+    Every navigation target found by a page scan, in scan order: hover
+    revealed links, click navigations, popup nested links and popup actions.
+    """
+    targets = []
+    for hover in scan.get("hover_interactions", []):
+        targets.extend(link["href"] for link in hover.get("revealed_links", []))
+    for click in scan.get("click_interactions", []):
+        result = click.get("result", {})
+        if result.get("type") == "navigate":
+            targets.append(result.get("target_url"))
+        elif result.get("type") == "popup":
+            targets.extend(link["href"] for link in result.get("nested_links", []))
+            targets.extend(action.get("target_url") for action in result.get("actions", []))
+    return [t for t in targets if t]
+
+
+def is_crawlable(url: str, start_url: str) -> bool:
+    return same_origin(url, start_url) and not urlparse(url).path.lower().endswith(SKIP_EXTENSIONS)
+
+
+# ==========================
+# CRAWL
+# ==========================
+
+def _failed_scan(url: str, error: Exception) -> dict:
+    safe_print(f"[crawl] Scan failed for {url}: {error}")
+    return {"page_url": url, "error": str(error), "hover_interactions": [], "click_interactions": []}
+
+
+def _scan_page(browser, url: str, scan_kwargs: dict) -> dict:
+    try:
+        return scan_homepage(url, browser=browser, **scan_kwargs)
+    except Exception as e:
+        return _failed_scan(url, e)
+
+
+def crawl_site(start_url: str, max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES,
+               workers: int = CRAWL_WORKERS, scan_kwargs: dict | None = None,
+               browser_pool: BrowserPool | None = None) -> dict:
+    """
+    Breadth-first crawl of the start URL's origin.
+
+    Pages of one depth level are scanned in parallel on the warm browsers
+    of `browser_pool` (a pool of `workers` browsers if none is given), then
+    their navigation targets are canonicalized, filtered to the same origin
+    and deduplicated against every URL seen so far to form the next level.
+    Processing whole levels in discovery order keeps the output
+    deterministic regardless of which scan finishes first.
+
+    All scans share one TemplateIndex, so interactions inside the site's
+    common header/nav/footer are analyzed on the first page only.
+    """
+    scan_kwargs = dict(scan_kwargs or {})
+    template_index = scan_kwargs.setdefault("template_index", TemplateIndex())
+    start = canonicalize_url(start_url, start_url)
+    seen = {start}
+    discovered = [start]  # `seen` in discovery order
+    frontier = [start]
+    pages = []
+    edges = []
+
+    own_pool = browser_pool is None
+    if own_pool:
+        browser_pool = BrowserPool(workers)
+    try:
+        depth = 0
+        while frontier and depth <= max_depth and len(pages) < max_pages:
+            batch = frontier[:max_pages - len(pages)]
+            safe_print(f"[crawl] Depth {depth}: scanning {len(batch)} page(s)")
+
+            futures = [browser_pool.submit(_scan_page, u, scan_kwargs) for u in batch]
+            scans = []
+            for url, future in zip(batch, futures):
+                try:
+                    scans.append(future.result())
+                except Exception as e:  # no browser could be launched
+                    scans.append(_failed_scan(url, e))
+
+            next_frontier = []
+            for url, scan in zip(batch, scans):
+                links = []
+                for target in extract_targets(scan):
+                    canon = canonicalize_url(url, target)
+                    if not canon or same_page_path(canon, url) or not is_crawlable(canon, start):
+                        continue
+                    if canon not in links:
+                        links.append(canon)
+                    if canon not in seen:
+                        seen.add(canon)
+                        discovered.append(canon)
+                        next_frontier.append(canon)
+                edges.extend([url, link] for link in links)
+                pages.append({"url": url, "depth": depth, "links": links, **scan})
+
+            frontier = next_frontier
+            depth += 1
+    finally:
+        if own_pool:
+            browser_pool.close()
+
+    scanned = {p["url"] for p in pages}
+    return {
+        "start_url": start,
+        "max_depth": max_depth,
+        "max_pages": max_pages,
+        "pages": pages,
+        "edges": edges,
+        "unscanned": [u for u in discovered if u not in scanned],
+        "template_reuse": template_index.stats(),
+    }
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl a site and scan every page for interactions.")
+    parser.add_argument("url")
+    parser.add_argument("--depth", type=int, default=CRAWL_MAX_DEPTH, help="maximum link depth (default: %(default)s)")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES, help="page budget (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS, help="pages scanned in parallel (default: %(default)s)")
+    parser.add_argument(
+        "--click-workers", type=int, default=CLICK_WORKERS,
+        help="parallel browsers for click analysis within a page (default: %(default)s)"
+    )
+    parser.add_argument("--output", default="site_interactions.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    site = crawl_site(
+        args.url,
+        max_depth=args.depth,
+        max_pages=args.max_pages,
+        workers=args.workers,
+        scan_kwargs={"workers": args.click_workers},
+    )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(site, f, indent=2, ensure_ascii=False)
+
+    safe_print(f"\n[crawl] Scanned {len(site['pages'])} page(s), {len(site['unscanned'])} left in the frontier")
+    safe_print(f"Saved to {args.output}")
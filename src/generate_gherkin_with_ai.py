@@ -1,7 +1,38 @@
+import argparse
+import asyncio
 import json
 import os
-from groq import Groq
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from groq import AsyncGroq, Groq
 from dotenv import load_dotenv
+from gherkin_rules import generate_rules
+from result_cache import LLMCache
+from scan_encoding import DEFAULT_PROMPT_STYLE, compact_scan, encode, estimate_tokens, format_notes
+
+FEATURE_OUTPUT_PATH = "outputs/ai_generated_scenarios.feature"
+
+# Input tokens per generation request (scan part of the user message)
+CHUNK_TOKEN_BUDGET = 3000
+# Generation requests in flight at once
+LLM_CONCURRENCY = 4
+
+# Long-lived sync clients by API key (see get_client)
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+ENGINES = ("rules", "llm", "hybrid")
+DEFAULT_ENGINE = "hybrid"
+
+# Scan keys that hold one interaction per trigger
+INTERACTION_KEYS = ("hover_interactions", "click_interactions")
+
+# Lines that start a block after the Feature header
+BLOCK_KEYWORDS = ("Background:", "Scenario:", "Scenario Outline:", "Scenario Template:", "Example:", "Rule:")
+MERGED_FEATURE_LINE = "Feature: Validate page interactions"
 
 def safe_print(message):
     """Print with safe encoding for Windows console"""
@@ -21,23 +52,337 @@ def load_prompt_template():
     with open(prompt_file, 'r', encoding='utf-8') as f:
         return f.read()
 
-def generate_gherkin_with_groq(json_file_path):
-    """Generate Gherkin scenarios using Groq AI"""
-    
+def load_settings():
+    """Load Groq credentials and model settings from .env (None if no API key)"""
     load_dotenv()
     
-    # Load credentials from .env
     api_key = os.getenv("GROQ_API_KEY")
-    model_name = os.getenv("MODEL_NAME", "llama-3.3-70b-versatile")
-    max_tokens = int(os.getenv("MAX_TOKENS", "8000"))
-    
     if not api_key:
         safe_print("Error: GROQ_API_KEY not found in .env file")
         return None
     
-    # Load scan results
+    return {
+        "api_key": api_key,
+        "model_name": os.getenv("MODEL_NAME", "llama-3.3-70b-versatile"),
+        "max_tokens": int(os.getenv("MAX_TOKENS", "8000")),
+        "chunk_tokens": int(os.getenv("CHUNK_TOKENS", str(CHUNK_TOKEN_BUDGET))),
+        "concurrency": int(os.getenv("LLM_CONCURRENCY", str(LLM_CONCURRENCY))),
+        "use_cache": os.getenv("LLM_CACHE", "1") != "0",
+        "prompt_style": os.getenv("PROMPT_STYLE", DEFAULT_PROMPT_STYLE),
+    }
+
+def _interaction_units(scan_data, budget, style):
+    """
+    (key, interaction) units in scan order: one per hover menu or click
+    trigger. A hover menu too large for one chunk is split into several
+    units over its revealed links.
+    """
+    units = []
+    for key in INTERACTION_KEYS:
+        for interaction in scan_data.get(key, []):
+            links = interaction.get("revealed_links", [])
+            if estimate_tokens(encode(interaction, style)) <= budget or len(links) < 2:
+                units.append((key, interaction))
+                continue
+            part = []
+            for link in links:
+                candidate = {**interaction, "revealed_links": part + [link]}
+                if part and estimate_tokens(encode(candidate, style)) > budget:
+                    units.append((key, {**interaction, "revealed_links": part}))
+                    part = []
+                part.append(link)
+            units.append((key, {**interaction, "revealed_links": part}))
+    return units
+
+def plan_chunks(scan_data, budget=CHUNK_TOKEN_BUDGET, style=DEFAULT_PROMPT_STYLE):
+    """
+    Split a (compacted) scan into scan-shaped chunks whose encoding stays
+    under `budget` tokens. Interactions are kept whole (menus only split
+    when they do not fit on their own) and packed in scan order, so the
+    plan is deterministic.
+    """
+    base = {k: v for k, v in scan_data.items() if k not in INTERACTION_KEYS}
+    overhead = estimate_tokens(build_user_message(base, style))
+    chunks = []
+    current, used = None, 0
+    for key, interaction in _interaction_units(scan_data, budget, style):
+        size = estimate_tokens(encode(interaction, style))
+        if current is None or used + size > budget:
+            current, used = dict(base), overhead
+            chunks.append(current)
+        current.setdefault(key, []).append(interaction)
+        used += size
+    return chunks
+
+def build_user_message(scan_data, style=DEFAULT_PROMPT_STYLE):
+    """User message asking for scenarios covering the given (compacted) scan results"""
+    notes = format_notes(style)
+    if notes:
+        notes = f"\n{notes}\n"
+    return f"""
+Based on the following JSON scan results, generate Gherkin test scenarios:
+{notes}
+{encode(scan_data, style)}
+
+Generate the Gherkin feature file now.
+"""
+
+def get_client(api_key):
+    """Groq client shared by every generation in this process (keeps its connection pool warm)"""
+    with _CLIENTS_LOCK:
+        if api_key not in _CLIENTS:
+            _CLIENTS[api_key] = Groq(api_key=api_key)
+        return _CLIENTS[api_key]
+
+def chat_request(settings, system_prompt, user_message):
+    """Keyword arguments of one chat completion request"""
+    return dict(
+        messages=[
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": user_message
+            }
+        ],
+        model=settings["model_name"],
+        temperature=0.1,
+        max_tokens=settings["max_tokens"],
+        top_p=0.85,
+    )
+
+def request_gherkin(client, settings, system_prompt, user_message, cache=None):
+    """Send one generation request (unless cached) and return the cleaned feature text"""
+    request = chat_request(settings, system_prompt, user_message)
+    cached = cache.get(request) if cache else None
+    if cached is not None:
+        return cached
+    response = client.chat.completions.create(**request)
+    gherkin_content = clean_gherkin(response.choices[0].message.content)
+    if cache:
+        cache.put(request, gherkin_content)
+    return gherkin_content
+
+async def generate_chunks(settings, system_prompt, chunks, cache=None):
+    """
+    Generate every chunk concurrently, at most settings["concurrency"]
+    requests at a time. Chunks found in `cache` skip the API call. Returns
+    one feature text (or exception) per chunk, in chunk order.
+    """
+    client = AsyncGroq(api_key=settings["api_key"])
+    semaphore = asyncio.Semaphore(max(1, settings["concurrency"]))
+    
+    async def generate(index, chunk):
+        request = chat_request(settings, system_prompt, build_user_message(chunk, settings["prompt_style"]))
+        cached = cache.get(request) if cache else None
+        if cached is not None:
+            safe_print(f"Chunk {index + 1}/{len(chunks)} from cache")
+            return cached
+        async with semaphore:
+            response = await client.chat.completions.create(**request)
+        gherkin_content = clean_gherkin(response.choices[0].message.content)
+        if cache:
+            cache.put(request, gherkin_content)
+        safe_print(f"Chunk {index + 1}/{len(chunks)} done")
+        return gherkin_content
+    
+    try:
+        return await asyncio.gather(
+            *(generate(i, chunk) for i, chunk in enumerate(chunks)), return_exceptions=True
+        )
+    finally:
+        await client.close()
+
+def clean_gherkin(gherkin_content):
+    """Minimal cleanup: drop anything the model wrote before the Feature line"""
+    gherkin_content = gherkin_content.strip()
+    if "Feature:" in gherkin_content and not gherkin_content.startswith("Feature:"):
+        gherkin_content = gherkin_content[gherkin_content.find("Feature:"):]
+    return gherkin_content
+
+class StreamCleaner:
+    """clean_gherkin() for a streamed completion: text is held back until the Feature line arrives"""
+    
+    def __init__(self):
+        self.buffer = ""
+        self.started = False
+    
+    def feed(self, delta):
+        """Text of `delta` that can be shown now"""
+        if self.started:
+            return delta
+        self.buffer += delta
+        pos = self.buffer.find("Feature:")
+        if pos < 0:
+            return ""
+        self.started = True
+        text, self.buffer = self.buffer[pos:], ""
+        return text
+    
+    def finish(self):
+        """Held-back text at the end of the stream (a completion without a Feature line is kept whole)"""
+        return "" if self.started else self.buffer.strip()
+
+def _stream_completion(client, request, on_text):
+    """Run one streamed request, passing cleaned text to on_text as it arrives; returns the cleaned full text"""
+    cleaner = StreamCleaner()
+    raw = []
+    for event in client.chat.completions.create(**request, stream=True):
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content or ""
+        raw.append(delta)
+        text = cleaner.feed(delta)
+        if text:
+            on_text(text)
+    tail = cleaner.finish()
+    if tail:
+        on_text(tail)
+    return clean_gherkin("".join(raw))
+
+def stream_chunks(settings, system_prompt, chunks, cache=None):
+    """
+    Stream every chunk, at most settings["concurrency"] at a time. Yields the
+    list of chunk texts so far (in chunk order) whenever a chunk completes a
+    line or finishes; after the last yield every entry holds the final
+    cleaned text ("" for a failed chunk). Cached chunks appear at once.
+    """
+    client = get_client(settings["api_key"])
+    texts = [""] * len(chunks)
+    updates = queue.Queue()  # chunk index when a chunk finishes, None for progress
+    
+    def run(index, chunk):
+        request = chat_request(settings, system_prompt, build_user_message(chunk, settings["prompt_style"]))
+        try:
+            cached = cache.get(request) if cache else None
+            if cached is not None:
+                texts[index] = cached
+                return
+            
+            def on_text(text):
+                texts[index] += text
+                if "\n" in text:
+                    updates.put(None)
+            
+            texts[index] = _stream_completion(client, request, on_text)
+            if cache:
+                cache.put(request, texts[index])
+        except Exception as e:
+            safe_print(f"Error in chunk {index + 1}: {e}")
+            texts[index] = ""
+        finally:
+            updates.put(index)
+    
+    with ThreadPoolExecutor(max_workers=max(1, settings["concurrency"])) as pool:
+        for index, chunk in enumerate(chunks):
+            pool.submit(run, index, chunk)
+        finished = 0
+        while finished < len(chunks):
+            if updates.get() is not None:
+                finished += 1
+            yield list(texts)
+
+def _split_feature(gherkin_content):
+    """(Feature line, Background block, scenario blocks) of one feature text"""
+    feature_line = None
+    background = None
+    blocks = []
+    tags = []
+    current = None
+    for line in gherkin_content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("Feature:") and feature_line is None:
+            feature_line = stripped
+            continue
+        if stripped.startswith("@"):
+            tags.append(line)
+            continue
+        if stripped.startswith(BLOCK_KEYWORDS):
+            current = tags + [line]
+            tags = []
+            if stripped.startswith("Background:"):
+                if background is None:
+                    background = current
+                else:
+                    current = []  # later Backgrounds are dropped
+            else:
+                blocks.append(current)
+            continue
+        if current is not None:
+            current.append(line)
+    return feature_line, background, blocks
+
+def _scenario_key(block):
+    """Scenarios with the same steps are duplicates, whatever their title"""
+    steps = [" ".join(line.split()).lower() for line in block if line.strip()]
+    steps = [line for line in steps if not line.startswith("@")]
+    return tuple(steps[1:]) or tuple(steps)
+
+def merge_features(parts):
+    """
+    Merge per-chunk feature texts into one well-formed feature file: one
+    Feature line (kept if all parts agree, else a generic one), the first
+    Background, then every scenario in part order with duplicates removed.
+    """
+    feature_lines = []
+    background = None
+    blocks = []
+    seen = set()
+    for part in parts:
+        if not part or not part.strip():
+            continue
+        feature_line, part_background, part_blocks = _split_feature(part)
+        if feature_line and feature_line not in feature_lines:
+            feature_lines.append(feature_line)
+        if background is None:
+            background = part_background
+        for block in part_blocks:
+            key = _scenario_key(block)
+            if key in seen:
+                continue
+            seen.add(key)
+            blocks.append(block)
+    if not blocks:
+        return ""
+    
+    header = feature_lines[0] if len(feature_lines) == 1 else MERGED_FEATURE_LINE
+    sections = [header]
+    for block in ([background] if background else []) + blocks:
+        text = "\n".join(block).rstrip()
+        sections.append(re.sub(r"\n{3,}", "\n\n", text))
+    return "\n\n".join(sections) + "\n"
+
+def save_feature(gherkin_content, output_path=FEATURE_OUTPUT_PATH):
+    """Write the feature file"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(gherkin_content)
+
+def save_parts(parts, output_path=FEATURE_OUTPUT_PATH):
+    """Merge ready-made feature parts and write them (None if they hold no scenarios)"""
+    gherkin_content = merge_features(parts)
+    if not gherkin_content:
+        safe_print("Error: no scenarios generated")
+        return None
+    save_feature(gherkin_content, output_path)
+    safe_print("Scenarios generated: ai_generated_scenarios.feature")
+    return gherkin_content
+
+def load_scan(json_file_path):
+    """Load scan results from a JSON file"""
     with open(json_file_path, 'r', encoding='utf-8') as f:
-        scan_data = json.load(f)
+        return json.load(f)
+
+def has_interactions(scan_data):
+    return any(scan_data.get(key) for key in INTERACTION_KEYS)
+
+def prepare_generation(scan_data):
+    """(settings, system prompt, chunks) for scan results, or None if generation cannot start"""
+    
+    settings = load_settings()
+    if settings is None:
+        return None
     
     # Load system prompt from markdown file
     try:
@@ -46,46 +391,79 @@ def generate_gherkin_with_groq(json_file_path):
         safe_print(str(e))
         return None
     
-    # Prepare user message with JSON data
-    user_message = f"""
-Based on the following JSON scan results, generate Gherkin test scenarios:
+    style = settings["prompt_style"]
+    compact = compact_scan(scan_data, style)
+    safe_print(
+        f"Prompt size ({style}): ~{estimate_tokens(encode(scan_data, 'json'))}"
+        f" -> ~{estimate_tokens(encode(compact, style))} tokens"
+    )
+    
+    chunks = plan_chunks(compact, settings["chunk_tokens"], style)
+    if not chunks:
+        safe_print("No interactions to generate scenarios for")
+        return None
+    return settings, system_prompt, chunks
 
-{json.dumps(scan_data, indent=2)}
+def stream_gherkin(scan_data, output_path=FEATURE_OUTPUT_PATH, parts=()):
+    """
+    Generate Gherkin scenarios with streamed completions. Yields the merged
+    feature text (after the ready-made `parts`) each time it grows and
+    rewrites the feature file with it, so scenarios show up from the first
+    tokens on.
+    """
+    prepared = prepare_generation(scan_data)
+    if prepared is None:
+        return
+    settings, system_prompt, chunks = prepared
+    safe_print(f"Streaming Gherkin scenarios in {len(chunks)} chunk(s)...")
+    
+    cache = LLMCache() if settings["use_cache"] else None
+    started = time.perf_counter()
+    first_scenario = None
+    for texts in stream_chunks(settings, system_prompt, chunks, cache):
+        gherkin_content = merge_features(list(parts) + texts)
+        if not gherkin_content:
+            continue
+        if first_scenario is None:
+            first_scenario = time.perf_counter() - started
+            safe_print(f"First scenario after {first_scenario:.1f}s")
+        save_feature(gherkin_content, output_path)
+        yield gherkin_content
+    if cache:
+        safe_print(f"LLM cache: {cache.stats()}")
 
-Generate the Gherkin feature file now.
-"""
+def stream_gherkin_with_groq(json_file_path, output_path=FEATURE_OUTPUT_PATH):
+    """stream_gherkin() for a scan results file"""
+    yield from stream_gherkin(load_scan(json_file_path), output_path)
+
+def generate_chunked(scan_data, output_path=FEATURE_OUTPUT_PATH, parts=()):
+    """Generate Gherkin scenarios in concurrent chunks and save them after the ready-made `parts`"""
+    
+    prepared = prepare_generation(scan_data)
+    if prepared is None:
+        return None
+    settings, system_prompt, chunks = prepared
+    safe_print(f"Generating Gherkin scenarios in {len(chunks)} chunk(s)...")
     
-    safe_print("Generating Gherkin scenarios...")
+    cache = LLMCache() if settings["use_cache"] else None
     
     try:
-        client = Groq(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": user_message
-                }
-            ],
-            model=model_name,
-            temperature=0.1,
-            max_tokens=max_tokens,
-            top_p=0.85,
-        )
-        
-        gherkin_content = response.choices[0].message.content.strip()
-        
-        # Minimal cleanup
-        if "Feature:" in gherkin_content and not gherkin_content.startswith("Feature:"):
-            gherkin_content = gherkin_content[gherkin_content.find("Feature:"):]
+        results = asyncio.run(generate_chunks(settings, system_prompt, chunks, cache))
+        if cache:
+            safe_print(f"LLM cache: {cache.stats()}")
+        parts = list(parts)
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                safe_print(f"Error in chunk {i + 1}: {result}")
+            else:
+                parts.append(result)
+        gherkin_content = merge_features(parts)
+        if not gherkin_content:
+            safe_print("Error: no scenarios generated")
+            return None
         
         # Save to file
-        with open('outputs/ai_generated_scenarios.feature', 'w', encoding='utf-8') as f:
-            f.write(gherkin_content)
+        save_feature(gherkin_content, output_path)
         
         safe_print("Scenarios generated: ai_generated_scenarios.feature")
         
@@ -95,6 +473,78 @@ Generate the Gherkin feature file now.
         safe_print(f"Error: {e}")
         return None
 
+def generate_gherkin_with_groq(json_file_path, stream=False):
+    """Generate Gherkin scenarios using Groq AI"""
+    return generate_gherkin(json_file_path, engine="llm", stream=stream)
+
+def generate_gherkin(json_file_path, engine=DEFAULT_ENGINE, stream=True, output_path=FEATURE_OUTPUT_PATH):
+    """Generate Gherkin scenarios for a scan results file (see generate_from_scan)"""
+    return generate_from_scan(load_scan(json_file_path), engine, stream, output_path)
+
+def generate_from_scan(scan_data, engine=DEFAULT_ENGINE, stream=True, output_path=FEATURE_OUTPUT_PATH,
+                       on_update=None):
+    """
+    Generate Gherkin scenarios for scan results with the chosen engine:
+    - "rules":  local templates only (no network), interactions they don't cover are skipped
+    - "llm":    everything through Groq
+    - "hybrid": templates where they apply, Groq only for the remaining interactions
+    When streaming, on_update is called with the feature text each time it grows.
+    If Groq is not configured or its generation fails, "hybrid" still writes
+    the template scenarios.
+    """
+    parts = []
+    if engine != "llm":
+        started = time.perf_counter()
+        parts, scan_data = generate_rules(scan_data)
+        left = len(scan_data.get("click_interactions", []))
+        safe_print(
+            f"Rules engine: {sum(p.count('Scenario:') for p in parts)} scenario(s) in "
+            f"{(time.perf_counter() - started) * 1000:.0f}ms, {left} interaction(s) left"
+        )
+        if engine == "rules" and left:
+            safe_print(f"Skipping {left} interaction(s) no template covers (use --engine hybrid to send them to the LLM)")
+    
+    if engine == "rules" or not has_interactions(scan_data):
+        return save_parts(parts, output_path)
+    
+    if not stream:
+        gherkin_content = generate_chunked(scan_data, output_path, parts)
+    else:
+        gherkin_content = None
+        updates = stream_gherkin(scan_data, output_path, parts)
+        while True:
+            # Errors of on_update (e.g. a cancelled job) must reach the caller
+            try:
+                gherkin_content = next(updates)
+            except StopIteration:
+                break
+            except Exception as e:
+                safe_print(f"Error: {e}")
+                break
+            if on_update:
+                on_update(gherkin_content)
+        if gherkin_content:
+            safe_print("Scenarios generated: ai_generated_scenarios.feature")
+    
+    if not gherkin_content and parts:
+        safe_print("Warning: LLM generation failed, writing the rule-based scenarios only")
+        gherkin_content = save_parts(parts, output_path)
+        if gherkin_content and on_update:
+            on_update(gherkin_content)
+    elif not gherkin_content:
+        safe_print("Error: no scenarios generated")
+    return gherkin_content
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Gherkin scenarios from scan results.")
+    parser.add_argument("scan_json", nargs="?", default="data/homepage_interactions.json")
+    parser.add_argument(
+        "--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+        help="rules: local templates only, llm: Groq only, hybrid: templates + Groq for the rest (default: %(default)s)"
+    )
+    parser.add_argument("--no-stream", action="store_true", help="wait for complete LLM responses instead of streaming")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    generate_gherkin_with_groq("data/homepage_interactions.json")
\ No newline at end of file
+    args = parse_args()
+    generate_gherkin(args.scan_json, engine=args.engine, stream=not args.no_stream)
@@ -0,0 +1,175 @@
+from urllib.parse import urlparse
+
+from scan_encoding import compact_hovers
+
+# ==========================
+# CONFIG
+# ==========================
+
+HOVER_FEATURE = "Feature: Validate navigation menu functionality"
+CLICK_FEATURE = "Feature: Validate button navigation functionality"
+
+# Popup action outcomes the templates know how to verify
+POPUP_OUTCOMES = {
+    "navigate": 'Then the page URL should change to "{url}"',
+    "navigate_new_tab": 'Then a new tab should open with the URL "{url}"',
+    "stay_on_same_page": "Then the popup should close and the user should remain on the same page",
+}
+
+
+# ==========================
+# UTILITIES
+# ==========================
+
+def _q(text: str) -> str:
+    """Label safe to put inside a quoted step argument."""
+    return " ".join((text or "").replace('"', "'").split())
+
+
+def page_name(url: str) -> str:
+    """Readable destination name from a URL: its last path segment, else its host."""
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split("/") if s]
+    if not segments:
+        return parsed.netloc or url
+    name = segments[-1].rsplit(".", 1)[0].replace("-", " ").replace("_", " ")
+    return name[:1].upper() + name[1:]
+
+
+def scenario(title: str, steps: list) -> str:
+    return "\n".join([f"  Scenario: {title}"] + [f"    {step}" for step in steps])
+
+
+def _given(page_url: str) -> str:
+    return f'Given the user is on the "{page_url}" page'
+
+
+# ==========================
+# TEMPLATES
+# ==========================
+
+def hover_scenarios(page_url: str, menu: dict) -> list:
+    """One scenario per revealed link of a (compacted) hover menu."""
+    trigger = menu["triggers"][0]
+    trigger = trigger["text"] if isinstance(trigger, dict) else trigger
+    return [
+        scenario(
+            f"Navigate to {_q(link['text'])} page from {_q(trigger)} menu",
+            [
+                _given(page_url),
+                f'When the user hovers over the "{_q(trigger)}" menu',
+                f'And clicks on the "{_q(link["text"])}" link',
+                f'Then the page URL should change to "{link["href"]}"',
+            ],
+        )
+        for link in menu["revealed_links"]
+        if link.get("text") and link.get("href")
+    ]
+
+
+def _scroll_step(result: dict) -> str | None:
+    delta = result.get("scroll_delta") or 0
+    if not delta:
+        return None
+    return f"And the page should scroll {'down' if delta > 0 else 'up'}"
+
+
+def click_scenarios(page_url: str, click: dict) -> list | None:
+    """
+    Scenarios for one click interaction, [] when there is nothing to test,
+    or None when the result does not fit a template (left to the LLM).
+    """
+    trigger = _q(click["trigger"]["text"])
+    result = click["result"]
+    kind = result["type"]
+
+    if kind == "none":
+        return []
+
+    if kind == "navigate" and result.get("target_url"):
+        return [scenario(
+            f"Navigate to {_q(page_name(result['target_url']))} via {trigger} button",
+            [
+                _given(page_url),
+                f'When the user clicks the "{trigger}" button',
+                f'Then the page URL should change to "{result["target_url"]}"',
+            ],
+        )]
+
+    if kind == "navigate_internal" and result.get("target_url"):
+        target = urlparse(result["target_url"]).fragment or page_name(result["target_url"])
+        steps = [
+            _given(page_url),
+            f'When the user clicks the "{trigger}" link',
+            f'Then the page URL should change to "{result["target_url"]}"',
+        ]
+        scroll = _scroll_step(result)
+        if scroll:
+            steps.append(scroll)
+        return [scenario(f"Jump to {_q(target)} section via {trigger} link", steps)]
+
+    if kind == "scroll":
+        scroll = _scroll_step(result)
+        if not scroll:
+            return None
+        return [scenario(
+            f"Scroll the page via {trigger} button",
+            [_given(page_url), f'When the user clicks the "{trigger}" button', "Then" + scroll[len("And"):]],
+        )]
+
+    if kind == "popup":
+        actions = result.get("actions") or []
+        if not actions or any(a.get("expected") not in POPUP_OUTCOMES for a in actions):
+            return None
+        if any(a.get("expected") != "stay_on_same_page" and not a.get("target_url") for a in actions):
+            return None
+        title = result.get("title")
+        appears = f'Then a popup should appear with the title "{_q(title)}"' if title else "Then a popup should appear"
+        steps = [_given(page_url)]
+        for action in actions:
+            steps += [
+                f'When the user clicks the "{trigger}" button',
+                appears,
+                f'When the user clicks the "{_q(action["text"])}" button',
+                POPUP_OUTCOMES[action["expected"]].format(url=action.get("target_url")),
+            ]
+        labels = " and ".join(_q(a["text"]) for a in actions)
+        where = f"{_q(title)} popup" if title else f"popup opened by {trigger}"
+        return [scenario(f"Verify {labels} actions in {where}", steps)]
+
+    return None
+
+
+# ==========================
+# ENGINE
+# ==========================
+
+def feature(header: str, scenarios: list) -> str:
+    return "\n\n".join([header] + scenarios) + "\n" if scenarios else ""
+
+
+def generate_rules(scan: dict) -> tuple:
+    """
+    Rule-based Gherkin for a scan: (feature texts, remaining scan). The
+    remaining scan holds only the interactions no template covers, in the
+    same shape as the input, for the LLM to handle.
+    """
+    page_url = scan.get("page_url")
+    hover_part = []
+    for menu in compact_hovers(scan.get("hover_interactions", []), "", "min"):
+        hover_part += hover_scenarios(page_url, menu)
+
+    click_part = []
+    remaining_clicks = []
+    for click in scan.get("click_interactions", []):
+        scenarios = click_scenarios(page_url, click)
+        if scenarios is None:
+            remaining_clicks.append(click)
+        else:
+            click_part += scenarios
+
+    parts = [p for p in (feature(HOVER_FEATURE, hover_part), feature(CLICK_FEATURE, click_part)) if p]
+    remaining = {"page_url": page_url}
+    if remaining_clicks:
+        remaining["click_interactions"] = remaining_clicks
+    return parts, remaining
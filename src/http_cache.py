@@ -0,0 +1,349 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# ==========================
+# CONFIG
+# ==========================
+
+# Same-origin static assets served from the scan cache after the first fetch
+CACHEABLE_RESOURCE_TYPES = {"stylesheet", "script", "font", "image"}
+
+# Resource types that never affect interaction results
+BLOCKED_RESOURCE_TYPES = {"media"}
+
+# Analytics / ad / tracking hosts (subdomains included)
+BLOCKED_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "cdn.segment.com",
+    "fullstory.com",
+    "nr-data.net",
+    "snap.licdn.com",
+    "px.ads.linkedin.com",
+    "analytics.tiktok.com",
+    "static.ads-twitter.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "adsrvr.org",
+    "demdex.net",
+    "omtrdc.net",
+]
+
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+# Freshness of a disk-cached response without max-age / Expires (seconds);
+# stale entries are revalidated with their ETag / Last-Modified
+DEFAULT_FRESHNESS = 60 * 60
+
+# Headers describing the original transfer, not the (decoded) body we replay
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+# ==========================
+# UTILITIES
+# ==========================
+
+def host_is_blocked(url: str, blocked_hosts=BLOCKED_HOSTS) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in blocked_hosts)
+
+
+def same_origin(url1: str, url2: str) -> bool:
+    u1, u2 = urlparse(url1), urlparse(url2)
+    return (u1.scheme, u1.netloc) == (u2.scheme, u2.netloc)
+
+
+def _header(headers: dict, name: str) -> str:
+    return next((v for k, v in headers.items() if k.lower() == name), "")
+
+
+def fresh_until(headers: dict, now: float, default: float = DEFAULT_FRESHNESS) -> float:
+    """When a response stops being fresh: max-age, else Expires, else `default` seconds from `now`."""
+    cache_control = _header(headers, "cache-control").lower()
+    match = re.search(r"(?:^|[,\s])max-age\s*=\s*(\d+)", cache_control)
+    if match:
+        return now + int(match.group(1))
+    expires = _header(headers, "expires")
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            date = _header(headers, "date")
+            # Expires is relative to the server's clock
+            served_at = parsedate_to_datetime(date).timestamp() if date else now
+            return now + expires_at - served_at
+        except (TypeError, ValueError, OverflowError):
+            return now  # invalid Expires means already expired
+    return now + default
+
+
+# ==========================
+# RESPONSE CACHE
+# ==========================
+
+class ResponseCache:
+    """
+    Content-addressed response cache shared by every context of a scan.
+
+    URLs map to (status, headers, sha256 digest); bodies are stored once per
+    digest, in memory or under `cache_dir`, and evicted least-recently-used
+    once their total size exceeds `max_bytes`. Safe to share across the
+    click-worker threads.
+
+    An in-memory cache lives for one scan and serves every entry. The disk
+    cache outlives scans (and deploys), so it honours max-age / Expires
+    (DEFAULT_FRESHNESS otherwise), revalidates stale entries with their
+    validators and never stores no-cache or private responses.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES, cache_dir: str | None = None,
+                 default_freshness: float = DEFAULT_FRESHNESS):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.default_freshness = default_freshness
+        self._index = {}             # url -> {"status", "headers", "digest", "expires"}
+        self._blobs = OrderedDict()  # digest -> bytes (memory) or size (disk), LRU order
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.blocked = 0
+        self.bytes_served = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_index()
+
+    # ---- disk layout ----
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load_index(self) -> None:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for digest in saved.get("lru", []):
+            try:
+                size = os.path.getsize(self._blob_path(digest))
+            except OSError:
+                continue
+            self._blobs[digest] = size
+            self._size += size
+        self._index = {
+            url: entry for url, entry in saved.get("urls", {}).items()
+            if entry["digest"] in self._blobs
+        }
+
+    def save(self) -> None:
+        """Persist the URL index (disk mode only) so later scans can reuse it."""
+        if not self.cache_dir:
+            return
+        with self._lock:
+            data = {"urls": self._index, "lru": list(self._blobs)}
+        with open(self._index_path(), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    # ---- blob store ----
+
+    def _read_blob(self, digest: str) -> bytes | None:
+        if not self.cache_dir:
+            return self._blobs.get(digest)
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_blob(self, digest: str, body: bytes) -> None:
+        if not self.cache_dir:
+            self._blobs[digest] = body
+            return
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+        self._blobs[digest] = len(body)
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._blobs:
+            digest, blob = self._blobs.popitem(last=False)
+            self._size -= blob if isinstance(blob, int) else len(blob)
+            if self.cache_dir:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+            self._index = {u: e for u, e in self._index.items() if e["digest"] != digest}
+
+    # ---- public API ----
+
+    def _serve(self, entry: dict):
+        """(status, headers, body) of an index entry (call with the lock held)."""
+        body = self._read_blob(entry["digest"]) if entry["digest"] in self._blobs else None
+        if body is None:
+            return None
+        self._blobs.move_to_end(entry["digest"])
+        self.bytes_served += len(body)
+        return entry["status"], entry["headers"], body
+
+    def get(self, url: str):
+        """(status, headers, body) for a cached URL that is still fresh, or None."""
+        with self._lock:
+            entry = self._index.get(url)
+            hit = None
+            if entry is not None and (not self.cache_dir or entry.get("expires", 0) > time.time()):
+                hit = self._serve(entry)
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return hit
+
+    def validators(self, url: str) -> dict:
+        """Conditional request headers for a stale cached URL ({} if it has no validators)."""
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is None or entry["digest"] not in self._blobs:
+            return {}
+        conditional = {}
+        if _header(entry["headers"], "etag"):
+            conditional["if-none-match"] = _header(entry["headers"], "etag")
+        if _header(entry["headers"], "last-modified"):
+            conditional["if-modified-since"] = _header(entry["headers"], "last-modified")
+        return conditional
+
+    def revalidate(self, url: str, headers: dict):
+        """
+        Renew a cached URL after a 304 with the response's `headers`;
+        returns (status, headers, body) or None if the entry is gone.
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            entry["expires"] = fresh_until(headers, time.time(), self.default_freshness)
+            hit = self._serve(entry)
+            if hit is not None:
+                self.revalidated += 1
+            return hit
+
+    def storable(self, headers: dict) -> bool:
+        cache_control = _header(headers, "cache-control").lower()
+        if "no-store" in cache_control:
+            return False
+        return not self.cache_dir or not ("no-cache" in cache_control or "private" in cache_control)
+
+    def put(self, url: str, status: int, headers: dict, body: bytes) -> None:
+        if len(body) > self.max_bytes or not self.storable(headers):
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        expires = fresh_until(headers, time.time(), self.default_freshness)
+        headers = {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS}
+        with self._lock:
+            if digest not in self._blobs:
+                self._write_blob(digest, body)
+                self._size += len(body)
+            self._blobs.move_to_end(digest)
+            self._index[url] = {"status": status, "headers": headers, "digest": digest, "expires": expires}
+            self._evict()
+
+    def record_blocked(self) -> None:
+        with self._lock:
+            self.blocked += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "blocked": self.blocked,
+                "bytes_served_from_cache": self.bytes_served,
+                "cached_urls": len(self._index),
+                "cached_bytes": self._size,
+            }
+
+
+# ==========================
+# ROUTING
+# ==========================
+
+def install_network_rules(context, base_url: str, cache: ResponseCache | None = None,
+                          block: bool = True, blocked_types=BLOCKED_RESOURCE_TYPES) -> None:
+    """
+    Route every request of `context` through the blocklist and the cache.
+    Note that routing disables Chromium's own HTTP cache for the context,
+    which is why same-origin assets are cached here instead.
+    """
+    if cache is None and not block:
+        return
+
+    def handle(route, request):
+        url = request.url
+        if block and (request.resource_type in blocked_types or host_is_blocked(url)):
+            if cache is not None:
+                cache.record_blocked()
+            route.abort()
+            return
+
+        if (
+            cache is None
+            or request.method != "GET"
+            or request.resource_type not in CACHEABLE_RESOURCE_TYPES
+            or not same_origin(url, base_url)
+        ):
+            route.continue_()
+            return
+
+        hit = cache.get(url)
+        if hit:
+            status, headers, body = hit
+            route.fulfill(status=status, headers=headers, body=body)
+            return
+
+        conditional = cache.validators(url) if cache.cache_dir else {}
+        try:
+            if conditional:
+                response = route.fetch(headers={**request.headers, **conditional})
+            else:
+                response = route.fetch()
+            body = response.body()
+        except Exception:
+            route.continue_()
+            return
+        if response.status == 304 and conditional:
+            hit = cache.revalidate(url, response.headers)
+            if hit:
+                status, headers, body = hit
+                route.fulfill(status=status, headers=headers, body=body)
+                return
+            route.continue_()
+            return
+        if response.status == 200:
+            cache.put(url, response.status, response.headers, body)
+        route.fulfill(response=response, body=body)
+
+    context.route("**/*", handle)
@@ -0,0 +1,364 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from browser_pool import BrowserPool, get_pool
+from generate_gherkin_with_ai import DEFAULT_ENGINE, ENGINES, generate_from_scan
+from pipeline import scan_page
+from playwright_interactions import safe_print
+
+# ==========================
+# CONFIG
+# ==========================
+
+JOBS_DB_PATH = "data/jobs.sqlite"
+JOBS_OUTPUT_DIR = "outputs/jobs"                    # one <job id>.feature per job
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))    # jobs running at once
+JOB_QUEUE_SIZE = 200                                # queued jobs before submissions are refused
+JOB_HOST_LIMIT = 2                                  # running jobs per host
+JOB_TIMEOUT = 600                                   # seconds, scan + generation
+JOB_POLL_SECONDS = 0.5                              # how often a running scan checks for cancellation
+
+# queued -> running -> succeeded | failed | cancelled | timed_out
+FINISHED_STATES = ("succeeded", "failed", "cancelled", "timed_out")
+
+
+class JobStopped(Exception):
+    """Raised inside a job when it is cancelled or runs out of time."""
+
+    def __init__(self, status: str):
+        super().__init__(status)
+        self.status = status
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit() when JOB_QUEUE_SIZE jobs are already waiting."""
+
+
+# ==========================
+# JOB STORE
+# ==========================
+
+class JobStore:
+    """
+    Jobs persisted in one SQLite table, so status and results survive a
+    restart of the app. A connection is opened per operation, so one
+    instance can be used from several threads.
+    """
+
+    TABLE = "jobs"
+    COLUMNS = ("id", "url", "host", "options", "status", "progress", "error",
+               "created", "started", "finished", "scan", "feature")
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                "id TEXT PRIMARY KEY, url TEXT, host TEXT, options TEXT, status TEXT, progress TEXT, "
+                "error TEXT, created REAL, started REAL, finished REAL, scan TEXT, feature TEXT)"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_status ON {self.TABLE} (status, created)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:  # commit / rollback
+                yield db
+        finally:
+            db.close()
+
+    def _row(self, row, full: bool) -> dict:
+        job = dict(zip(self.COLUMNS, row))
+        job["options"] = json.loads(job["options"] or "{}")
+        job["progress"] = json.loads(job["progress"] or "{}")
+        scan = job.pop("scan")
+        feature = job.pop("feature")
+        if full:
+            job["scan"] = json.loads(scan) if scan else None
+            job["feature"] = feature
+        return job
+
+    def create(self, url: str, options: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                f"INSERT INTO {self.TABLE} (id, url, host, options, status, progress, created) "
+                "VALUES (?, ?, ?, ?, 'queued', '{}', ?)",
+                (job_id, url, urlparse(url).netloc, json.dumps(options), time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str, full: bool = False) -> dict | None:
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM {self.TABLE} WHERE id = ?", (job_id,)
+            ).fetchone()
+        return None if row is None else self._row(row, full)
+
+    def list(self, status: str | None = None, limit: int = 100) -> list:
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM {self.TABLE}"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._connect() as db:
+            rows = db.execute(query, params + (limit,)).fetchall()
+        return [self._row(row, full=False) for row in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        for key in ("options", "progress", "scan"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE {self.TABLE} SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def finish(self, job_id: str, status: str, error: str | None = None, **fields) -> None:
+        self.update(job_id, status=status, error=error, finished=time.time(), **fields)
+
+    def recover(self) -> list:
+        """
+        After a restart: jobs that were running are marked failed (their
+        scan died with the old process), queued ones are returned oldest
+        first to be queued again.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                f"UPDATE {self.TABLE} SET status = 'failed', error = 'interrupted by a restart', finished = ? "
+                "WHERE status = 'running'",
+                (now,),
+            )
+            rows = db.execute(
+                f"SELECT id, host FROM {self.TABLE} WHERE status = 'queued' ORDER BY created"
+            ).fetchall()
+        return rows
+
+
+# ==========================
+# JOB QUEUE
+# ==========================
+
+class JobQueue:
+    """
+    Bounded queue of scan + generate jobs run by a fixed set of worker
+    threads on a shared BrowserPool.
+
+    Workers take the oldest queued job whose host has fewer than
+    `host_limit` jobs running, so a batch of URLs from one site cannot
+    occupy every worker. Each job has a deadline of `timeout` seconds from
+    its start. A cancelled queued job never runs; a cancelled or timed-out
+    running job stops waiting for its scan (which is dropped from the pool
+    if it has not started yet, otherwise left to finish on its browser) or
+    stops its generation at the next streamed update.
+    """
+
+    def __init__(self, store: JobStore | None = None, browser_pool: BrowserPool | None = None,
+                 workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 host_limit: int = JOB_HOST_LIMIT, timeout: float = JOB_TIMEOUT,
+                 output_dir: str = JOBS_OUTPUT_DIR):
+        self.store = store or JobStore()
+        self.browser_pool = browser_pool
+        self.max_queued = max_queued
+        self.host_limit = host_limit
+        self.timeout = timeout
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._pending = deque()   # (job id, host)
+        self._running = {}        # host -> running job count
+        self._cancelled = set()
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for job_id, host in self.store.recover():
+            self._pending.append((job_id, host))
+        if self._pending:
+            safe_print(f"[jobs] Re-queued {len(self._pending)} job(s) from the job store")
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ---- public API ----
+
+    def submit(self, url: str, engine: str = DEFAULT_ENGINE, refresh: bool = False,
+               timeout: float | None = None) -> dict:
+        """Queue a job for `url` and return it; raises QueueFull when the queue is full."""
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+            raise ValueError("timeout must be a positive number of seconds")
+        options = {"engine": engine, "refresh": refresh, "timeout": timeout or self.timeout}
+        with self._cond:
+            if len(self._pending) >= self.max_queued:
+                raise QueueFull(f"{len(self._pending)} jobs already queued")
+            job = self.store.create(url, options)
+            self._pending.append((job["id"], job["host"]))
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, job_id: str) -> dict | None:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return job
+        with self._cond:
+            queued = [entry for entry in self._pending if entry[0] == job_id]
+            for entry in queued:
+                self._pending.remove(entry)
+            if queued:
+                self.store.finish(job_id, "cancelled", "cancelled before it started")
+            else:
+                self._cancelled.add(job_id)
+        return self.store.get(job_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": len(self._threads),
+                "queued": len(self._pending),
+                "running": sum(self._running.values()),
+                "running_by_host": {host: n for host, n in self._running.items() if n},
+                "max_queued": self.max_queued,
+                "host_limit": self.host_limit,
+            }
+
+    def close(self) -> None:
+        """Stop the workers after their current job; queued jobs stay queued in the store."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    # ---- workers ----
+
+    def _next_job(self):
+        """The oldest pending job whose host is under its limit (call with the lock held)."""
+        for entry in self._pending:
+            if self._running.get(entry[1], 0) < self.host_limit:
+                self._pending.remove(entry)
+                return entry
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                entry = None
+                while not self._closed:
+                    entry = self._next_job()
+                    if entry:
+                        break
+                    self._cond.wait()
+                if entry is None:
+                    return
+                job_id, host = entry
+                self._running[host] = self._running.get(host, 0) + 1
+            try:
+                self._run(job_id)
+            except Exception as e:
+                safe_print(f"[jobs] Job {job_id} crashed: {e}")
+                self.store.finish(job_id, "failed", str(e))
+            finally:
+                with self._cond:
+                    self._running[host] -= 1
+                    self._cancelled.discard(job_id)
+                    self._cond.notify_all()
+
+    def _check(self, job_id: str, deadline: float) -> None:
+        if job_id in self._cancelled:
+            raise JobStopped("cancelled")
+        if time.time() > deadline:
+            raise JobStopped("timed_out")
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] != "queued":
+            return
+        options = job["options"]
+        started = time.time()
+        deadline = started + options.get("timeout", self.timeout)
+        progress = {"phase": "scan", "interactions": 0}
+        self.store.update(job_id, status="running", started=started, progress=progress)
+        stopped = threading.Event()   # an abandoned scan may keep reporting events
+
+        def on_event(event):
+            if event["event"] in ("hover", "click") and not stopped.is_set():
+                progress["interactions"] += 1
+                self.store.update(job_id, progress=progress)
+
+        def on_update(text):
+            self._check(job_id, deadline)
+            progress["scenarios"] = text.count("Scenario:")
+            self.store.update(job_id, progress=progress)
+
+        try:
+            pool = self.browser_pool or get_pool()
+            future = pool.submit(
+                lambda browser: scan_page(url=job["url"], refresh=options.get("refresh", False),
+                                          scan_kwargs={"browser": browser, "on_event": on_event})
+            )
+            while True:
+                try:
+                    scan = future.result(timeout=JOB_POLL_SECONDS)
+                    break
+                except FutureTimeout:
+                    try:
+                        self._check(job_id, deadline)
+                    except JobStopped:
+                        future.cancel()
+                        raise
+
+            self._check(job_id, deadline)
+            progress.update({"phase": "generate", "scenarios": 0})
+            self.store.update(job_id, progress=progress, scan=scan)
+            feature = generate_from_scan(
+                scan, engine=options.get("engine", DEFAULT_ENGINE),
+                output_path=os.path.join(self.output_dir, f"{job_id}.feature"), on_update=on_update
+            )
+        except JobStopped as e:
+            stopped.set()
+            safe_print(f"[jobs] Job {job_id} {e.status.replace('_', ' ')}: {job['url']}")
+            self.store.finish(job_id, e.status, "cancelled" if e.status == "cancelled" else
+                              f"exceeded {options.get('timeout', self.timeout)}s")
+            return
+        except Exception as e:
+            stopped.set()
+            safe_print(f"[jobs] Job {job_id} failed: {e}")
+            self.store.finish(job_id, "failed", str(e))
+            return
+
+        progress["phase"] = "done"
+        if feature:
+            progress["scenarios"] = feature.count("Scenario:")
+            self.store.finish(job_id, "succeeded", progress=progress, feature=feature)
+        else:
+            self.store.finish(job_id, "failed", "no scenarios generated", progress=progress)
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide job queue, created on first use."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue()
+        return _QUEUE
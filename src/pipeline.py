@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from generate_gherkin_with_ai import (
+    DEFAULT_ENGINE,
+    ENGINES,
+    FEATURE_OUTPUT_PATH,
+    build_user_message,
+    generate_from_scan,
+    get_client,
+    load_prompt_template,
+    load_settings,
+    merge_features,
+    request_gherkin,
+    save_feature,
+)
+from browser_pool import BrowserPool
+from gherkin_rules import generate_rules
+from playwright_interactions import (
+    CLICK_WORKERS,
+    SCAN_OUTPUT_PATH,
+    safe_print,
+    scan_homepage,
+    scan_with_cache,
+)
+from result_cache import LLMCache
+from scan_encoding import compact_scan
+
+# ==========================
+# CONFIG
+# ==========================
+
+PIPELINE_BATCH_SIZE = 5       # interactions per generation request
+PIPELINE_FLUSH_SECONDS = 15   # send a partial batch after this long without new events
+PIPELINE_LLM_WORKERS = 2      # generation requests in flight at once
+
+# Scan result key holding each event kind
+EVENT_KEYS = {"hover": "hover_interactions", "click": "click_interactions"}
+
+
+# ==========================
+# IN-PROCESS PIPELINE
+# ==========================
+
+def scan_page(url: str, refresh: bool = False, use_cache: bool = True,
+              browser_pool: BrowserPool | None = None, scan_kwargs: dict | None = None,
+              timeout: float | None = None) -> dict:
+    """
+    Scan one page in this process. With a `browser_pool` the scan runs on
+    one of its warm browsers instead of launching a new one.
+    """
+    def scan(browser=None):
+        kwargs = dict(scan_kwargs or {})
+        if browser is not None:
+            kwargs["browser"] = browser
+        if use_cache:
+            return scan_with_cache(url, refresh=refresh, **kwargs)
+        return scan_homepage(url, **kwargs)
+
+    if browser_pool is None:
+        return scan()
+    return browser_pool.run(scan, timeout=timeout)
+
+
+def save_scan(scan: dict, path: str = SCAN_OUTPUT_PATH) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(scan, f, indent=2, ensure_ascii=False)
+
+
+def run_pipeline(url: str, engine: str = DEFAULT_ENGINE, refresh: bool = False, use_cache: bool = True,
+                 browser_pool: BrowserPool | None = None, stream: bool = True, on_update=None,
+                 output_path: str = FEATURE_OUTPUT_PATH, scan_output_path: str | None = SCAN_OUTPUT_PATH,
+                 scan_kwargs: dict | None = None, timeout: float | None = None) -> dict:
+    """
+    Scan `url` and generate its feature file in this process, returning
+    {"scan": scan result, "feature": feature text or None}. The scan and the
+    feature are also written to disk for the command-line tools. Pass a
+    long-lived `browser_pool` to reuse warm browsers across calls;
+    `on_update` receives the feature text as it streams in.
+    """
+    scan = scan_page(url, refresh, use_cache, browser_pool, scan_kwargs, timeout)
+    if scan_output_path:
+        save_scan(scan, scan_output_path)
+    feature = generate_from_scan(scan, engine, stream, output_path, on_update)
+    return {"scan": scan, "feature": feature}
+
+
+# ==========================
+# STREAMING PIPELINE
+# ==========================
+
+def _scan_thread(url: str, events: "queue.Queue", use_cache: bool, scan_kwargs: dict,
+                 browser_pool: BrowserPool | None) -> None:
+    try:
+        scan_page(url, use_cache=use_cache, browser_pool=browser_pool,
+                  scan_kwargs={**scan_kwargs, "on_event": events.put})
+    except Exception as e:
+        events.put({"event": "error", "page_url": url, "error": str(e)})
+
+
+def _generate_batch(client, settings: dict, system_prompt: str, url: str, kind: str, batch: list,
+                    cache: LLMCache | None) -> str:
+    style = settings["prompt_style"]
+    scan_data = compact_scan({"page_url": url, EVENT_KEYS[kind]: batch}, style)
+    return request_gherkin(client, settings, system_prompt, build_user_message(scan_data, style), cache)
+
+
+def _ready(text: str) -> Future:
+    future = Future()
+    future.set_result(text)
+    return future
+
+
+def stream_pipeline(url: str, batch_size: int = PIPELINE_BATCH_SIZE, llm_workers: int = PIPELINE_LLM_WORKERS,
+                    output_path: str = FEATURE_OUTPUT_PATH, use_cache: bool = True,
+                    scan_kwargs: dict | None = None, engine: str = DEFAULT_ENGINE,
+                    browser_pool: BrowserPool | None = None):
+    """
+    Scan `url` and generate Gherkin at the same time.
+
+    The scan runs on its own thread and reports each finished interaction
+    through an event queue. Events are batched per feature (hover menus,
+    click behaviour) and each full batch is sent to the LLM right away while
+    scanning continues; a partial batch is sent when the scan goes quiet for
+    PIPELINE_FLUSH_SECONDS or finishes. Generated parts are merged in batch
+    order (see merge_features) and the feature file is rewritten as soon as
+    the next part in order is ready, so the first scenarios appear after the
+    first few interactions plus one LLM call instead of after the whole scan.
+
+    With the "rules" and "hybrid" engines, interactions covered by the
+    local templates (see gherkin_rules) are written immediately without an
+    LLM call; "hybrid" batches the rest for the LLM, "rules" skips them.
+
+    Without LLM settings "hybrid" falls back to the rules alone.
+
+    Returns (scan result, feature text); the scan result is None if the
+    scan failed.
+    """
+    settings = system_prompt = client = cache = None
+    if engine != "rules":
+        settings = load_settings()
+        try:
+            system_prompt = load_prompt_template() if settings is not None else None
+        except FileNotFoundError as e:
+            safe_print(str(e))
+            settings = None
+        if settings is None:
+            if engine == "llm":
+                return None, None
+            safe_print("[pipeline] Warning: LLM unavailable, writing rule-based scenarios only")
+            engine = "rules"
+        else:
+            client = get_client(settings["api_key"])
+            cache = LLMCache() if settings["use_cache"] else None
+
+    started = time.perf_counter()
+    events = queue.Queue()
+    scanner = threading.Thread(
+        target=_scan_thread, args=(url, events, use_cache, dict(scan_kwargs or {}), browser_pool), daemon=True
+    )
+    scanner.start()
+
+    pending = {kind: [] for kind in EVENT_KEYS}
+    futures = []   # generation futures in batch order
+    parts = []     # finished parts, a prefix of `futures`
+    first_scenario_s = None
+    result = None
+    seen_menus = set()  # link sets of hover menus already written by the rules
+
+    def apply_rules(kind, interaction):
+        """True if the rules engine handled the interaction."""
+        if kind == "hover":
+            menu = frozenset(link["href"] for link in interaction.get("revealed_links", []))
+            if menu in seen_menus:
+                return True
+            seen_menus.add(menu)
+        rule_parts, remaining = generate_rules({"page_url": url, EVENT_KEYS[kind]: [interaction]})
+        if remaining.get("click_interactions"):
+            return engine == "rules"
+        if rule_parts:
+            futures.extend(_ready(part) for part in rule_parts)
+        return True
+
+    def flush(kind):
+        if pending[kind]:
+            safe_print(f"[pipeline] Generating part {len(futures) + 1}: {len(pending[kind])} {kind} interaction(s)")
+            futures.append(pool.submit(
+                _generate_batch, client, settings, system_prompt, url, kind, pending[kind], cache
+            ))
+            pending[kind] = []
+
+    def collect(block):
+        nonlocal first_scenario_s
+        while len(parts) < len(futures) and (block or futures[len(parts)].done()):
+            try:
+                parts.append(futures[len(parts)].result())
+            except Exception as e:
+                safe_print(f"[pipeline] Generation failed for part {len(parts) + 1}: {e}")
+                parts.append("")
+            save_feature(merge_features(parts), output_path)
+            if first_scenario_s is None and "Scenario" in parts[-1]:
+                first_scenario_s = time.perf_counter() - started
+                safe_print(f"[pipeline] First scenarios written after {first_scenario_s:.1f}s")
+
+    with ThreadPoolExecutor(max_workers=max(1, llm_workers)) as pool:
+        while True:
+            try:
+                event = events.get(timeout=PIPELINE_FLUSH_SECONDS)
+            except queue.Empty:
+                for kind in pending:
+                    flush(kind)
+                collect(block=False)
+                continue
+
+            kind = event["event"]
+            if kind == "error":
+                safe_print(f"[pipeline] Scan failed: {event['error']}")
+                break
+            if kind == "done":
+                result = event["result"]
+                break
+            if kind == "click" and event["interaction"]["result"]["type"] == "none":
+                continue
+            if engine != "llm" and apply_rules(kind, event["interaction"]):
+                collect(block=False)
+                continue
+            pending[kind].append(event["interaction"])
+            if len(pending[kind]) >= batch_size:
+                flush(kind)
+            collect(block=False)
+
+        for kind in pending:
+            flush(kind)
+        collect(block=True)
+
+    scanner.join()
+    feature = merge_features(parts)
+    total_s = time.perf_counter() - started
+    safe_print(
+        f"[pipeline] {len(parts)} part(s) generated in {total_s:.1f}s"
+        + (f", first scenarios after {first_scenario_s:.1f}s" if first_scenario_s is not None else "")
+    )
+    return result, feature
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a page and generate Gherkin while the scan is running.")
+    parser.add_argument("url")
+    parser.add_argument("--batch-size", type=int, default=PIPELINE_BATCH_SIZE, help="interactions per LLM request (default: %(default)s)")
+    parser.add_argument("--llm-workers", type=int, default=PIPELINE_LLM_WORKERS, help="LLM requests in flight (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=CLICK_WORKERS, help="parallel browsers for click analysis (default: %(default)s)")
+    parser.add_argument("--output", default=FEATURE_OUTPUT_PATH)
+    parser.add_argument("--no-scan-cache", action="store_true", help="don't read or write the persistent scan cache")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE, help="scenario generator (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    scan, feature = stream_pipeline(
+        args.url,
+        batch_size=args.batch_size,
+        llm_workers=args.llm_workers,
+        output_path=args.output,
+        use_cache=not args.no_scan_cache,
+        scan_kwargs={"workers": args.workers},
+        engine=args.engine,
+    )
+    if feature:
+        safe_print(f"Scenarios generated: {args.output}")
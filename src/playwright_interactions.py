@@ -1,7 +1,21 @@
 from playwright.sync_api import sync_playwright
+from http_cache import BLOCKED_RESOURCE_TYPES, ResponseCache, install_network_rules
+from result_cache import ScanCache, http_fingerprint
+from cookie_strategies import get_cookie_strategies
+from scan_budget import ScanBudget, activate_budget, current_budget, href_counts, priority
+from scan_metrics import ScanMetrics, activate, current, span, traced
+from template_index import TemplateIndex
+import argparse
 import json
+import os
+import queue
 import sys
-from urllib.parse import urljoin, urlparse
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
 
 # ==========================
 # CONFIG
@@ -32,7 +46,142 @@ HOVER_TRIGGER_SELECTOR = (
     "header a:visible, header button:visible"
 )
 
-MAX_CLICKABLES = 120  # safety cap
+POPUP_BUTTON_SELECTOR = (
+    "button:visible, a:visible, [role='button']:visible, input[type='button']:visible"
+)
+
+MAX_CLICKABLES = 120  # safety cap on the clickables snapshot, before prioritizing
+
+# Per-phase budgets: at most `max_elements` candidates (the highest-priority
+# ones, see scan_budget.priority()) and `max_seconds` of work per phase.
+# Phases out of time stop early and the scan is returned as partial.
+SCAN_BUDGETS = {
+    "hover": {"max_elements": 40, "max_seconds": 60},
+    "click_tests": {"max_elements": 40, "max_seconds": 180},
+    "popup_links": {"max_elements": 20},
+    "popup_buttons": {"max_elements": 10},
+}
+# Whole-scan deadline in seconds (None = none), kept under the UI's scan timeout
+SCAN_DEADLINE = 240
+
+SCAN_OUTPUT_PATH = "data/homepage_interactions.json"
+
+# Where safe_print() logs go (None = stdout). --ndjson moves them to stderr
+# so stdout only carries interaction events.
+LOG_STREAM = None
+
+# Consent buttons tried by auto_accept_cookies(), in order of preference
+COOKIE_BUTTON_NAMES = [
+    "Accept All Cookies",
+    "Accept all",
+    "Accept",
+    "Confirm My Choices",
+    "Agree",
+    "Got it",
+]
+# Some cookie UIs use generic classes / aria labels
+COOKIE_GENERIC_SELECTOR = "button.cookie, button[aria-label*='cookie']"
+
+# Storage state file (cookies + localStorage) every scan context starts from,
+# e.g. with consent already given (--storage-state)
+COOKIE_STORAGE_STATE = None
+
+# Optional per-scan span trace (--trace): Chrome trace for *.json, JSON lines otherwise
+TRACE_PATH = None
+
+# Query parameters that never change page content (dropped by canonicalize_url)
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl"}
+
+# Number of parallel browsers used for the per-click analysis.
+# 1 keeps the original sequential behaviour.
+CLICK_WORKERS = 1
+
+# How to decide that an interaction has finished:
+#   "event" - wait until navigation, DOM mutations, triggered requests and
+#             CSS transitions/animations go quiet (capped per step)
+#   "fixed" - the original fixed sleeps
+SETTLE_MODE = "event"
+SETTLE_QUIET_MS = 150       # DOM must be mutation-free for this long
+SETTLE_POLL_MS = 50
+SETTLE_LOOKBACK_MS = 500    # requests started this long before a step count as triggered by it
+
+# step -> (fixed sleep in ms, hard cap in ms for event mode). Caps stay
+# close to the fixed sleeps so event mode is never much slower than fixed.
+SETTLE_STEPS = {
+    "base_load": (1500, 2000),
+    "load": (1000, 1500),
+    "cookie": (500, 800),
+    "hover": (800, 1000),
+    "hover_reset": (200, 300),
+    "click": (2000, 2500),
+    "popup_open": (1500, 2000),
+    "popup_click": (2000, 2500),
+}
+
+# Only these request types keep a step "busy"; images, fonts, beacons etc. don't
+SETTLE_RESOURCE_TYPES = {"document", "fetch", "xhr", "script", "stylesheet"}
+
+# How hover-revealed links are found:
+#   "observer" - Mutation/IntersectionObservers installed once per page report
+#                only the anchors whose visibility changed
+#   "scan"     - snapshot every visible anchor before and after each hover
+HOVER_DIFF_MODE = "observer"
+
+# How each click/popup test gets a clean page at the base URL:
+#   "storage_state" - new context restored from the base page's storage
+#                     state (cookie banner already dismissed)
+#   "reuse_page"    - one long-lived page per worker, reset by going back or
+#                     reloading from cache and verified against the base page
+#   "fresh"         - brand-new context, full load and cookie dismissal
+ISOLATION_MODE = "storage_state"
+RESET_FAILURE_LIMIT = 2  # failed resets before "reuse_page" gives up
+
+# Abort analytics/ads/media requests (see http_cache.BLOCKED_HOSTS)
+BLOCK_REQUESTS = True
+
+# Browser launch/context settings:
+#   "default" - headless Chromium with the default 1280x720 viewport
+#   "headed"  - visible browser window (needs a display), for debugging
+#   "lean"    - headless, smaller viewport (still at the 1024px desktop
+#               breakpoint), scale factor 1, no images or fonts, reduced
+#               motion and CSS animations/transitions switched off
+LAUNCH_PROFILES = {
+    "default": {"headless": True},
+    "headed": {"headless": False},
+    "lean": {
+        "headless": True,
+        "args": ["--disable-gpu", "--disable-extensions", "--disable-background-networking", "--mute-audio"],
+        "viewport": {"width": 1024, "height": 640},
+        "device_scale_factor": 1,
+        "reduced_motion": True,
+        "disable_animations": True,
+        "block_resource_types": {"image", "font"},
+    },
+}
+LAUNCH_PROFILE = "default"
+
+# Injected by profiles with "disable_animations"
+NO_ANIMATIONS_CSS = """
+*, *::before, *::after {
+    animation-duration: 0s !important;
+    animation-delay: 0s !important;
+    transition-duration: 0s !important;
+    transition-delay: 0s !important;
+    scroll-behavior: auto !important;
+}
+"""
+NO_ANIMATIONS_JS = """
+(() => {
+    const add = () => {
+        const style = document.createElement('style');
+        style.setAttribute('data-gherkin-scan', 'no-animations');
+        style.textContent = %s;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) add();
+    else document.addEventListener('DOMContentLoaded', add, {once: true});
+})();
+""" % json.dumps(NO_ANIMATIONS_CSS)
 
 
 # ==========================
@@ -41,9 +190,9 @@ MAX_CLICKABLES = 120  # safety cap
 
 def safe_print(msg: str) -> None:
     try:
-        print(msg)
+        print(msg, file=LOG_STREAM or sys.stdout)
     except UnicodeEncodeError:
-        print(msg.encode("ascii", "ignore").decode("ascii"))
+        print(msg.encode("ascii", "ignore").decode("ascii"), file=LOG_STREAM or sys.stdout)
 
 
 def normalize_href(base_url: str, href: str | None) -> str | None:
@@ -57,58 +206,148 @@ def normalize_href(base_url: str, href: str | None) -> str | None:
 
 def safe_text(el, max_len: int = 200) -> str | None:
     """
-    Extract text safely from dynamic elements without throwing.
-    All timeouts/exceptions are swallowed here.
-    """
-    for method in [
-        lambda e: e.inner_text(timeout=300),
-        lambda e: e.text_content(timeout=300),
-        lambda e: e.get_attribute("aria-label"),
-        lambda e: e.get_attribute("title"),
-        lambda e: e.get_attribute("value"),
-        lambda e: e.get_attribute("href"),
-        lambda e: e.get_attribute("id"),
-    ]:
-        try:
-            txt = method(el)
-            if txt:
-                txt = " ".join(txt.split())
-                if 0 < len(txt) <= max_len:
-                    return txt
-        except Exception:
-            continue
-    return None
+    Label of one element (locator or element handle) without throwing:
+    the first of innerText, textContent, aria-label, title, value, href and
+    id that is 1..max_len characters once whitespace is collapsed, resolved
+    in a single round trip (see resolve_labels). None if there is none or
+    the element is not there within 300 ms.
+    """
+    js = f"(el, maxLen) => ({LABELS_JS})([el], maxLen)[0]"
+    try:
+        if hasattr(el, "evaluate_all"):  # Locator: don't wait for a missing element
+            return el.evaluate(js, max_len, timeout=300)
+        return el.evaluate(js, max_len)
+    except Exception:
+        return None
 
 
-def auto_accept_cookies(page):
-    """Try to dismiss cookie banners so they don't block clicks."""
-    cand_names = [
-        "Accept All Cookies",
-        "Accept all",
-        "Accept",
-        "Confirm My Choices",
-        "Agree",
-        "Got it",
-    ]
-    for name in cand_names:
-        try:
-            btn = page.get_by_role("button", name=name)
-            if btn.count() > 0:
-                btn.first.click(timeout=1000)
-                page.wait_for_timeout(500)
-                safe_print(f"[cookie] Clicked '{name}'")
-                return
-        except Exception:
-            continue
-    # Some cookie UIs use generic classes / aria labels
+def resolve_labels(locator, max_len: int = 200) -> list:
+    """safe_text() of every element matched by `locator`, in one page evaluation."""
     try:
-        candidate = page.locator("button.cookie, button[aria-label*='cookie']")
-        if candidate.count() > 0:
-            candidate.first.click(timeout=1000)
-            page.wait_for_timeout(500)
-            safe_print("[cookie] Clicked generic cookie button")
+        return locator.evaluate_all(LABELS_JS, max_len)
     except Exception:
-        pass
+        return []
+
+
+def active_budget() -> ScanBudget:
+    """The running scan's budget, or the element caps alone outside a scan."""
+    return current_budget() or ScanBudget(None, SCAN_BUDGETS)
+
+
+def prioritize(phase, entries: list, candidates: list) -> list:
+    """
+    The (label, snapshot item) `entries` that fit `phase`'s element budget,
+    best priority() first (href uniqueness is judged among `candidates`).
+    """
+    counts = href_counts(candidates)
+    return phase.select(entries, lambda entry: priority(entry[1], counts))
+
+
+def goto(page, url: str):
+    """
+    Load `url` the way every scan navigation does (recorded as a "goto"
+    span); the timeout never runs past the scan deadline.
+    """
+    with span("goto"):
+        return page.goto(url, wait_until="domcontentloaded", timeout=active_budget().timeout_ms(90000))
+
+
+# (_, {names, selector, attr}) -> the first visible button whose accessible
+# name contains one of `names` (in `names` order), else the first visible
+# match of `selector`; the element is tagged with `attr` for clicking.
+COOKIE_PROBE_JS = """
+(_, {names, selector, attr}) => {
+    const visible = el => {
+        const r = el.getBoundingClientRect();
+        const s = getComputedStyle(el);
+        return r.width > 0 && r.height > 0 && s.visibility !== 'hidden' && s.display !== 'none';
+    };
+    const label = el => (el.getAttribute('aria-label') || el.innerText || el.value || '')
+        .replace(/\\s+/g, ' ').trim().toLowerCase();
+    const mark = el => {
+        let id = el.getAttribute(attr);
+        if (!id) {
+            id = 'cookie-' + Math.random().toString(36).slice(2);
+            el.setAttribute(attr, id);
+        }
+        return id;
+    };
+    if (names.length) {
+        const buttons = [...document.querySelectorAll(
+            "button, [role='button'], input[type='button'], input[type='submit']"
+        )].filter(visible);
+        for (const name of names) {
+            const el = buttons.find(b => label(b).includes(name.toLowerCase()));
+            if (el) return {strategy: {kind: 'role', name}, id: mark(el)};
+        }
+    }
+    if (selector) {
+        const el = [...document.querySelectorAll(selector)].find(visible);
+        if (el) return {strategy: {kind: 'selector', selector}, id: mark(el)};
+    }
+    return null;
+}
+"""
+
+
+def _find_cookie_button(page, names: list, selector: str | None):
+    """One in-page query for a consent button: {"strategy", "id"} or None."""
+    try:
+        return page.evaluate(
+            f"args => ({COOKIE_PROBE_JS})(null, args)",
+            {"names": names, "selector": selector, "attr": SNAPSHOT_ATTR},
+        )
+    except Exception as e:
+        safe_print(f"[cookie] Probe failed: {e}")
+        return None
+
+
+@traced("cookies")
+def auto_accept_cookies(page, timings: dict | None = None, verify: bool = False):
+    """
+    Try to dismiss cookie banners so they don't block clicks.
+
+    The strategy that worked on this host and port before (see CookieStrategies) is
+    replayed first; otherwise every COOKIE_BUTTON_NAMES entry and the generic
+    selector are probed in one in-page query and the result -- including
+    "no banner" -- is recorded. Domains recorded without a banner are skipped
+    outright unless `verify` is set (the base page of a scan sets it, so a
+    banner that appeared since is picked up).
+    """
+    # netloc keeps the port: apps on one host (dev servers) differ
+    domain = urlparse(page.url).netloc.lower()
+    strategies = get_cookie_strategies()
+    known = strategies.get(domain)
+    found = None
+
+    if known is not None and known["kind"] != "none":
+        if known["kind"] == "role":
+            found = _find_cookie_button(page, [known["name"]], None)
+        else:
+            found = _find_cookie_button(page, [], known["selector"])
+        if found is None and not verify:
+            return  # consent already given in this context (restored storage state)
+    elif known is not None and not verify:
+        return
+
+    if found is None:
+        found = _find_cookie_button(page, COOKIE_BUTTON_NAMES, COOKIE_GENERIC_SELECTOR)
+        if found is None:
+            # With pre-seeded consent the banner is expected to be missing;
+            # don't teach the cache that the site has none
+            if not COOKIE_STORAGE_STATE:
+                strategies.record(domain, {"kind": "none"})
+            return
+
+    try:
+        snapshot_locator(page, found).click(timeout=1000)
+    except Exception as e:
+        safe_print(f"[cookie] Click failed: {e}")
+        strategies.forget(domain)
+        return
+    settle(page, "cookie", timings)
+    strategies.record(domain, found["strategy"])
+    safe_print(f"[cookie] Clicked {found['strategy'].get('name') or found['strategy'].get('selector')!r}")
 
 
 def get_scroll_y(page) -> int:
@@ -125,6 +364,668 @@ def same_page_path(url1: str, url2: str) -> bool:
     return (u1.scheme, u1.netloc, u1.path) == (u2.scheme, u2.netloc, u2.path)
 
 
+def canonicalize_url(base_url: str, href: str | None) -> str | None:
+    """
+    normalize_href() plus a canonical form for deduplication: http(s) only,
+    lowercase host without default port, no fragment, tracking parameters
+    removed and the remaining query sorted.
+    """
+    url = normalize_href(base_url, href)
+    if not url:
+        return None
+    u = urlparse(url)
+    scheme = u.scheme.lower()
+    if scheme not in ("http", "https"):
+        return None
+    host = (u.hostname or "").lower()
+    if u.port and not ((scheme == "http" and u.port == 80) or (scheme == "https" and u.port == 443)):
+        host = f"{host}:{u.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(u.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunparse((scheme, host, u.path or "/", "", urlencode(query), ""))
+
+
+# ==========================
+# SETTLE DETECTION
+# ==========================
+
+# Resolves true once the DOM has been mutation-free for quietMs and no finite
+# CSS transition/animation is running, or false when timeoutMs is reached.
+# style/class changes only count near the element under the mouse (its
+# list item or parent), so carousels and tickers elsewhere don't keep a
+# step busy until its cap
+SETTLE_JS = """
+({quietMs, timeoutMs}) => new Promise(resolve => {
+    const start = performance.now();
+    let last = start;
+    const hovered = [...document.querySelectorAll(':hover')].pop();
+    const scope = hovered ? (hovered.closest('li') || hovered.parentElement || hovered) : null;
+    const relevant = m => m.type !== 'attributes'
+        || (m.attributeName !== 'style' && m.attributeName !== 'class')
+        || (scope !== null && (scope.contains(m.target) || m.target.contains(scope)));
+    const observer = new MutationObserver(records => {
+        if (records.some(relevant)) last = performance.now();
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    const animating = () => document.getAnimations
+        ? document.getAnimations().some(a => a.playState === 'running'
+            && a.effect && a.effect.getTiming().iterations !== Infinity)
+        : false;
+    const tick = () => {
+        const now = performance.now();
+        const quiet = now - last >= quietMs && !animating();
+        if (quiet || now - start >= timeoutMs) {
+            observer.disconnect();
+            resolve(quiet);
+            return;
+        }
+        setTimeout(tick, 25);
+    };
+    setTimeout(tick, 25);
+})
+"""
+
+# page -> {request: monotonic start time} for requests still in flight
+_INFLIGHT = weakref.WeakKeyDictionary()
+
+# Pages whose DOM was still changing when a step hit its cap (autoplay,
+# tickers): later steps on them use the fixed sleeps
+_NEVER_QUIET = weakref.WeakSet()
+
+
+def watch_network(page) -> None:
+    """Track in-flight requests on `page` so settle() can wait for them."""
+    if page in _INFLIGHT:
+        return
+    inflight = {}
+    _INFLIGHT[page] = inflight
+
+    def on_request(req):
+        if req.resource_type in SETTLE_RESOURCE_TYPES:
+            inflight[req] = time.monotonic()
+
+    def on_done(req):
+        inflight.pop(req, None)
+
+    page.on("request", on_request)
+    page.on("requestfinished", on_done)
+    page.on("requestfailed", on_done)
+
+
+def _pending_requests(page, since: float) -> int:
+    inflight = _INFLIGHT.get(page) or {}
+    return sum(1 for started in list(inflight.values()) if started >= since)
+
+
+def _wait_until_settled(page, cap_ms: int, start: float) -> None:
+    deadline = start + cap_ms / 1000
+    since = start - SETTLE_LOOKBACK_MS / 1000
+    while True:
+        remaining = int((deadline - time.monotonic()) * 1000)
+        if remaining <= 0:
+            return
+        try:
+            quiet = page.evaluate(SETTLE_JS, {"quietMs": SETTLE_QUIET_MS, "timeoutMs": remaining})
+        except Exception:
+            # Navigation destroyed the execution context: wait for the new document
+            try:
+                page.wait_for_load_state("domcontentloaded", timeout=remaining)
+            except Exception:
+                return
+            continue
+        if not quiet:
+            # Still changing at the cap (not a slow navigation)
+            _NEVER_QUIET.add(page)
+            safe_print("[settle] Page never went quiet, using fixed waits on it from now on")
+            return
+        if not _pending_requests(page, since):
+            return
+        page.wait_for_timeout(SETTLE_POLL_MS)
+
+
+def settle(page, step: str, timings: dict | None = None) -> int:
+    """
+    Wait until the interaction behind `step` has finished (see SETTLE_MODE).
+    Returns the time spent in ms and adds it to `timings[step]` if given.
+    """
+    fixed_ms, cap_ms = SETTLE_STEPS[step]
+    start = time.monotonic()
+    with span("settle", step=step):
+        if SETTLE_MODE == "fixed" or page in _NEVER_QUIET:
+            page.wait_for_timeout(fixed_ms)
+        else:
+            _wait_until_settled(page, cap_ms, start)
+    elapsed = int((time.monotonic() - start) * 1000)
+    if timings is not None:
+        timings[step] = timings.get(step, 0) + elapsed
+    return elapsed
+
+
+# ==========================
+# DOM SNAPSHOT
+# ==========================
+
+# Attribute used to address snapshotted elements from Python afterwards
+SNAPSHOT_ATTR = "data-gherkin-id"
+
+# Selector for shared page components (see template_index)
+COMPONENT_SELECTOR = "header, nav, footer"
+
+# max_len values whose labels snapshots resolve in-page (see snapshot_label)
+SNAPSHOT_LABEL_LENS = (100, 150, 200)
+
+# In-page safe_text(): the label candidates in priority order, whitespace
+# collapsed like " ".join(text.split()) (Python's whitespace set) and lengths
+# counted in code points like len(), so labels match the Python side exactly.
+_LABEL_HELPERS_JS = r"""
+    const labelCandidates = el => [
+        el.innerText,
+        el.textContent,
+        el.getAttribute('aria-label'),
+        el.getAttribute('title'),
+        el.getAttribute('value'),
+        el.getAttribute('href'),
+        el.getAttribute('id'),
+    ];
+    const WHITESPACE = /[\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+/;
+    const normalizeLabel = txt => txt.split(WHITESPACE).filter(Boolean).join(' ');
+    const labelOf = (el, maxLen) => {
+        for (const raw of labelCandidates(el)) {
+            if (!raw) continue;
+            const txt = normalizeLabel(raw);
+            const length = [...txt].length;
+            if (length > 0 && length <= maxLen) return txt;
+        }
+        return null;
+    };
+    const labelsOf = (el, maxLens) => {
+        const txts = [];
+        for (const raw of labelCandidates(el)) {
+            if (!raw) continue;
+            const txt = normalizeLabel(raw);
+            txts.push([txt, [...txt].length]);
+        }
+        return Object.fromEntries(maxLens.map(maxLen => {
+            const hit = txts.find(([, length]) => length > 0 && length <= maxLen);
+            return [maxLen, hit ? hit[0] : null];
+        }));
+    };
+"""
+
+# (elements, maxLen) -> label of each element (see safe_text)
+LABELS_JS = """
+(els, maxLen) => {
+%s
+    return els.map(el => labelOf(el, maxLen));
+}
+""" % _LABEL_HELPERS_JS
+
+# Shared in-page helpers: Playwright's notion of visibility, the safe_text()
+# label for each SNAPSHOT_LABEL_LENS length, and the fingerprint of the
+# outermost header/nav/footer containing an element (tag skeleton hash +
+# href set hash, ignoring classes so "active" markers don't matter).
+_SNAPSHOT_HELPERS_JS = """
+%(labels)s
+    const state = window.__gherkinSnapshot || (window.__gherkinSnapshot = {next: 0});
+    const isVisible = el => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const fnv = str => {
+        let h = 0x811c9dc5;
+        for (let i = 0; i < str.length; i++) {
+            h ^= str.charCodeAt(i);
+            h = Math.imul(h, 0x01000193) >>> 0;
+        }
+        return h.toString(16).padStart(8, '0');
+    };
+    const components = new Map();
+    const componentOf = el => {
+        let root = null;
+        for (let n = el; n; n = n.parentElement) {
+            if (n.matches('%(component)s')) root = n;
+        }
+        if (!root) return null;
+        if (!components.has(root)) {
+            const tags = [], hrefs = [];
+            const walk = (n, depth) => {
+                tags.push(depth + n.tagName);
+                if (n.tagName === 'A') {
+                    const raw = n.getAttribute('href') || '';
+                    hrefs.push(raw.startsWith('#') ? raw : String(n.href));
+                }
+                for (const c of n.children) walk(c, depth + 1);
+            };
+            walk(root, 0);
+            hrefs.sort();
+            components.set(root, fnv(tags.join('|')) + fnv(hrefs.join('|')));
+        }
+        return components.get(root);
+    };
+    const describe = (el, index) => {
+        let id = el.getAttribute('%(attr)s');
+        if (!id) {
+            id = String(state.next++);
+            el.setAttribute('%(attr)s', id);
+        }
+        const r = el.getBoundingClientRect();
+        return {
+            id,
+            index,
+            visible: isVisible(el),
+            tag: el.tagName.toLowerCase(),
+            role: el.getAttribute('role'),
+            href: el.getAttribute('href'),
+            url: el.hasAttribute('href') ? String(el.href).split('#')[0] : null,
+            target: el.getAttribute('target'),
+            component: componentOf(el),
+            region: el.closest('nav, header') ? 'nav' : el.closest('footer') ? 'footer' : 'main',
+            haspopup: el.hasAttribute('aria-haspopup') || el.hasAttribute('aria-expanded'),
+            labels: labelsOf(el, %(label_lens)s),
+            box: {x: r.x, y: r.y, width: r.width, height: r.height},
+        };
+    };
+    const collect = (root, selector, limit) => {
+        const out = [];
+        const els = root.querySelectorAll(selector);
+        for (let i = 0; i < els.length; i++) {
+            if (limit !== null && out.length >= limit) break;
+            if (!isVisible(els[i])) continue;
+            out.push(describe(els[i], i));
+        }
+        return out;
+    };
+""" % {"attr": SNAPSHOT_ATTR, "component": COMPONENT_SELECTOR, "labels": _LABEL_HELPERS_JS,
+       "label_lens": json.dumps(SNAPSHOT_LABEL_LENS)}
+
+# (root, {selector, limit}) -> visible matches of selector under root
+SNAPSHOT_JS = """
+(root, {selector, limit}) => {
+%s
+    return collect(root || document, selector, limit);
+}
+""" % _SNAPSHOT_HELPERS_JS
+
+# (popup, {...}) -> first match per title selector + visible links and buttons
+POPUP_SNAPSHOT_JS = """
+(root, {titleSelectors, linkSelector, linkLimit, buttonSelector, buttonLimit}) => {
+%s
+    return {
+        titles: titleSelectors.map(sel => {
+            const el = root.querySelector(sel);
+            return el ? describe(el, 0) : null;
+        }),
+        links: collect(root, linkSelector, linkLimit),
+        buttons: collect(root, buttonSelector, buttonLimit),
+    };
+}
+""" % _SNAPSHOT_HELPERS_JS
+
+
+def css_selector(selector: str) -> str:
+    """Strip Playwright's :visible pseudo-class so the selector works in-page."""
+    return selector.replace(":visible", "")
+
+
+def snapshot_elements(page, selector: str, root=None, limit: int | None = None) -> list:
+    """
+    Describe every visible element matching `selector` (optionally under the
+    `root` locator) in a single page round trip: id, labels, href (raw
+    and resolved without its fragment as url), role, tag, page region (nav/main/footer), popup hints and bounding box.
+    At most `limit` elements are returned.
+    """
+    args = {"selector": css_selector(selector), "limit": limit}
+    try:
+        if root is not None:
+            return root.evaluate(SNAPSHOT_JS, args)
+        return page.evaluate(f"args => ({SNAPSHOT_JS})(null, args)", args)
+    except Exception as e:
+        safe_print(f"[snapshot] Failed for '{selector}': {e}")
+        return []
+
+
+def snapshot_label(item: dict, max_len: int = 200) -> str | None:
+    """
+    safe_text() of a snapshot entry. The label was resolved in-page, so
+    `max_len` must be one of SNAPSHOT_LABEL_LENS.
+    """
+    try:
+        return item["labels"][str(max_len)]
+    except KeyError:
+        raise ValueError(f"max_len must be one of {SNAPSHOT_LABEL_LENS}, got {max_len}") from None
+
+
+def snapshot_locator(page, item: dict):
+    """Locator for an element described by snapshot_elements()."""
+    return page.locator(f"[{SNAPSHOT_ATTR}='{item['id']}']")
+
+
+def snapshot_links(page, items: list | None = None) -> dict:
+    """
+    {absolute href: label} for every visible anchor (or for the given
+    snapshot `items`), in document order.
+    """
+    if items is None:
+        items = snapshot_elements(page, "a")
+    links = {}
+    for item in items:
+        href = normalize_href(page.url, item["href"])
+        if not href:
+            continue
+        txt = snapshot_label(item, max_len=200)
+        if not txt:
+            continue
+        links[href] = txt
+    return links
+
+
+# ==========================
+# HOVER WATCH
+# ==========================
+
+# Installs window.__gherkinHoverWatch once per document. Anchors are marked
+# dirty by DOM mutations (new/removed/re-rendered nodes, class/style changes)
+# and by an IntersectionObserver with a huge rootMargin, which fires whenever
+# an anchor gains or loses its layout box (e.g. display:none menus). The
+# trigger's nav/header subtree is always re-checked as well, to catch menus
+# that are only shown through CSS :hover + visibility.
+# flush(triggerId) re-checks dirty anchors and returns those that became
+# visible with an href that was not visible before.
+HOVER_WATCH_JS = """
+() => {
+    if (window.__gherkinHoverWatch) return true;
+%(helpers)s
+    const shown = new Map();    // anchor -> visible at last flush
+    const counts = new Map();   // absolute href -> number of visible anchors
+    const dirty = new Set();
+    const hrefOf = a => a.href ? String(a.href) : (a.getAttribute('href') || '');
+    const io = new IntersectionObserver(
+        entries => entries.forEach(e => dirty.add(e.target)),
+        {rootMargin: '100000px'}
+    );
+    const track = a => {
+        if (!shown.has(a)) {
+            shown.set(a, false);
+            io.observe(a);
+        }
+        dirty.add(a);
+    };
+    const markSubtree = node => {
+        if (!node || node.nodeType !== 1) return;
+        if (node.tagName === 'A') track(node);
+        node.querySelectorAll('a').forEach(track);
+    };
+    const handle = r => {
+        if (r.type === 'attributes' && r.attributeName === '%(attr)s') return;
+        if (r.type === 'childList') {
+            r.addedNodes.forEach(markSubtree);
+            r.removedNodes.forEach(markSubtree);
+        } else {
+            markSubtree(r.type === 'characterData' ? r.target.parentElement : r.target);
+        }
+    };
+    const mo = new MutationObserver(records => records.forEach(handle));
+    mo.observe(document, {subtree: true, childList: true, attributes: true,
+                          attributeFilter: ['class', 'style', 'hidden', 'aria-hidden', 'aria-expanded', 'open']});
+
+    const flush = async triggerId => {
+        await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+        mo.takeRecords().forEach(handle);
+        io.takeRecords().forEach(e => dirty.add(e.target));
+        if (triggerId !== null) {
+            const trigger = document.querySelector(`[%(attr)s="${triggerId}"]`);
+            markSubtree(trigger && (trigger.closest('nav, header') || trigger.parentElement));
+        }
+        const appeared = [], vanished = [];
+        dirty.forEach(a => {
+            const now = a.isConnected && isVisible(a);
+            if (now !== shown.get(a)) (now ? appeared : vanished).push(a);
+            if (!a.isConnected) {
+                io.unobserve(a);
+                shown.delete(a);
+            }
+        });
+        dirty.clear();
+        // Compare against the hrefs visible before this flush, so re-rendered
+        // menus (old node removed, new node added) are not reported as new.
+        const revealed = [], seen = new Set();
+        appeared.forEach(a => {
+            const href = hrefOf(a);
+            if (!(counts.get(href) > 0) && !seen.has(href)) {
+                seen.add(href);
+                revealed.push(a);
+            }
+        });
+        appeared.forEach(a => {
+            shown.set(a, true);
+            counts.set(hrefOf(a), (counts.get(hrefOf(a)) || 0) + 1);
+        });
+        vanished.forEach(a => {
+            if (a.isConnected) shown.set(a, false);
+            counts.set(hrefOf(a), (counts.get(hrefOf(a)) || 0) - 1);
+        });
+        return revealed.map((a, i) => describe(a, i));
+    };
+
+    document.querySelectorAll('a').forEach(track);
+    window.__gherkinHoverWatch = {flush};
+    return flush(null).then(() => true);
+}
+""" % {"helpers": _SNAPSHOT_HELPERS_JS, "attr": SNAPSHOT_ATTR}
+
+
+def install_hover_watch(page) -> bool:
+    """Install the hover watch on the current document. False if it failed."""
+    try:
+        return bool(page.evaluate(HOVER_WATCH_JS))
+    except Exception as e:
+        safe_print(f"[hover] Observer install failed, falling back to scan mode: {e}")
+        return False
+
+
+def hover_watch_flush(page, trigger_id: str) -> list | None:
+    """
+    Snapshot entries for anchors revealed since the previous flush, or None
+    if the watch is gone (e.g. the document was replaced).
+    """
+    try:
+        return page.evaluate(
+            "id => window.__gherkinHoverWatch ? window.__gherkinHoverWatch.flush(id) : null",
+            trigger_id
+        )
+    except Exception:
+        return None
+
+
+# ==========================
+# PAGE ISOLATION
+# ==========================
+
+def new_scan_context(browser, base_url: str, cache: ResponseCache | None = None, **kwargs):
+    """
+    New browser context with the launch profile's viewport/motion settings
+    and the scan's request blocking and asset cache.
+    """
+    profile = LAUNCH_PROFILES[LAUNCH_PROFILE]
+    options = {key: profile[key] for key in ("viewport", "device_scale_factor") if key in profile}
+    if profile.get("reduced_motion"):
+        options["reduced_motion"] = "reduce"
+    if COOKIE_STORAGE_STATE:
+        options["storage_state"] = COOKIE_STORAGE_STATE
+    options.update(kwargs)
+
+    ctx = browser.new_context(**options)
+    if profile.get("disable_animations"):
+        ctx.add_init_script(NO_ANIMATIONS_JS)
+    install_network_rules(
+        ctx, base_url, cache, block=BLOCK_REQUESTS,
+        blocked_types=BLOCKED_RESOURCE_TYPES | profile.get("block_resource_types", set()),
+    )
+
+    metrics = current()
+    if metrics is not None:
+        # Event handlers run without a driver round trip (headers are local)
+        metrics.count("contexts")
+        ctx.on("page", lambda page: metrics.count("pages"))
+        ctx.on("response", lambda response: (
+            metrics.count("responses"),
+            metrics.count("response_bytes", int(response.headers.get("content-length") or 0)),
+        ))
+    return ctx
+
+
+# Cheap description of the page state, used to check that a reset/restore
+# really brought the page back to what the base scan saw.
+PAGE_FINGERPRINT_JS = """
+({interactiveSelector, popupSelector}) => {
+    const isVisible = el => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    return {
+        url: location.href,
+        title: document.title,
+        interactive: Array.from(document.querySelectorAll(interactiveSelector)).filter(isVisible).length,
+        popup: Array.from(document.querySelectorAll(popupSelector)).some(isVisible),
+    };
+}
+"""
+
+
+def page_fingerprint(page) -> dict | None:
+    try:
+        return page.evaluate(PAGE_FINGERPRINT_JS, {
+            "interactiveSelector": css_selector(INTERACTIVE_SELECTOR),
+            "popupSelector": css_selector(POPUP_SELECTOR),
+        })
+    except Exception:
+        return None
+
+
+def fingerprint_matches(current: dict | None, baseline: dict | None) -> bool:
+    """Same title, no popup open, and roughly the same number of clickables."""
+    if not current or current["popup"]:
+        return False
+    if not baseline:
+        return True
+    tolerance = max(3, baseline["interactive"] // 10)
+    return (
+        current["title"] == baseline["title"]
+        and abs(current["interactive"] - baseline["interactive"]) <= tolerance
+    )
+
+
+class PageIsolation:
+    """
+    Hands out pages sitting on `base_url` for click/popup tests, using one of
+    the ISOLATION_MODE strategies. Pages that don't match the base page
+    fingerprint after a restore/reset are loaded again the slow way, and
+    "reuse_page" falls back to "storage_state"/"fresh" on repeated failures.
+    """
+
+    def __init__(self, browser, base_url: str, mode: str = ISOLATION_MODE,
+                 storage_state: dict | None = None, baseline: dict | None = None,
+                 cache: ResponseCache | None = None):
+        self.browser = browser
+        self.base_url = base_url
+        self.mode = mode
+        self.storage_state = storage_state
+        self.baseline = baseline
+        self.cache = cache
+        self.reset_failures = 0
+        self._page = None  # long-lived page in "reuse_page" mode
+
+    def _load(self, page, timings: dict, accept_cookies: bool) -> None:
+        goto(page, self.base_url)
+        settle(page, "load", timings)
+        if accept_cookies:
+            auto_accept_cookies(page, timings)
+            settle(page, "cookie", timings)
+
+    def _new_page(self, timings: dict):
+        restored = self.mode != "fresh" and self.storage_state is not None
+        kwargs = {"storage_state": self.storage_state} if restored else {}
+        ctx = new_scan_context(self.browser, self.base_url, self.cache, **kwargs)
+        page = ctx.new_page()
+        watch_network(page)
+        self._load(page, timings, accept_cookies=not restored)
+        if restored and not fingerprint_matches(page_fingerprint(page), self.baseline):
+            # Restored state didn't suppress the banner (or the page differs)
+            safe_print("  [isolation] Restored page differs from base page, dismissing cookies")
+            auto_accept_cookies(page, timings)
+            settle(page, "cookie", timings)
+        return page
+
+    def _reset(self, timings: dict):
+        """Bring the reused page back to base_url; None if that failed."""
+        page = self._page
+        # Where the base URL actually landed (after redirects)
+        home = (self.baseline or {}).get("url") or self.base_url
+        try:
+            for extra in page.context.pages:
+                if extra is not page:
+                    extra.close()
+            if not same_page_path(page.url, home):
+                # Left the page: back-navigation is served from bfcache/HTTP cache
+                page.go_back(wait_until="domcontentloaded", timeout=15000)
+                if page.url != home:
+                    goto(page, home)
+            elif page.url != home:
+                goto(page, home)
+            else:
+                page.reload(wait_until="domcontentloaded", timeout=30000)
+            settle(page, "load", timings)
+            page.evaluate("() => window.scrollTo(0, 0)")
+            if page.url == home and fingerprint_matches(page_fingerprint(page), self.baseline):
+                return page
+        except Exception as e:
+            safe_print(f"  [isolation] Reset failed: {e}")
+
+        self.reset_failures += 1
+        safe_print(f"  [isolation] Page did not reset cleanly ({self.reset_failures}/{RESET_FAILURE_LIMIT})")
+        self._discard()
+        if self.reset_failures >= RESET_FAILURE_LIMIT:
+            self.mode = "storage_state" if self.storage_state is not None else "fresh"
+            safe_print(f"  [isolation] Falling back to '{self.mode}' mode")
+        return None
+
+    def _discard(self) -> None:
+        if self._page is not None:
+            try:
+                self._page.context.close()
+            except Exception:
+                pass
+            self._page = None
+
+    @traced("page_setup")
+    def acquire(self, timings: dict):
+        """A page loaded at base_url, ready for one test."""
+        if self.mode == "reuse_page" and self._page is not None:
+            page = self._reset(timings)
+            if page is not None:
+                return page
+        page = self._new_page(timings)
+        if self.mode == "reuse_page":
+            self._page = page
+            if self.baseline is None:
+                self.baseline = page_fingerprint(page)
+        return page
+
+    def release(self, page) -> None:
+        """Done with a page from acquire(); reused pages stay open."""
+        if page is self._page:
+            return
+        try:
+            page.context.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        self._discard()
+
+
 # ==========================
 # POPUP ANALYSIS
 # ==========================
@@ -134,6 +1035,17 @@ def detect_popup_in_page(page):
     Look for a visible popup on the current page.
     Returns: (popup_locator, title, popup_button_labels, nested_links)
     """
+    popup, title, buttons, nested_links = analyze_popup(page)
+    if popup is None:
+        return None, None, None, None
+    return popup, title, [label for label, _ in buttons], nested_links
+
+
+def analyze_popup(page):
+    """
+    detect_popup_in_page() keeping the snapshot entry of every button.
+    Returns: (popup_locator, title, [(button_label, snapshot_item)], nested_links)
+    """
     popup = page.locator(POPUP_SELECTOR).first
     if popup.count() == 0:
         return None, None, None, None
@@ -148,73 +1060,240 @@ def detect_popup_in_page(page):
     except Exception:
         pass
 
-    # Title extraction
-    title = ""
+    # Title, nested links and action buttons in one round trip
     title_selectors = [
         "#third_party_interstitial_h1",
         ".popup_header h1",
         ".popup_header",
         "h1, h2, h3"
     ]
-    for sel in title_selectors:
-        loc = popup.locator(sel)
-        if loc.count() > 0:
-            t = safe_text(loc.first, max_len=200)
+    budget = active_budget()
+    try:
+        snap = popup.evaluate(POPUP_SNAPSHOT_JS, {
+            "titleSelectors": title_selectors,
+            "linkSelector": "a",
+            "linkLimit": budget.limit("popup_links"),
+            "buttonSelector": css_selector(POPUP_BUTTON_SELECTOR),
+            "buttonLimit": budget.limit("popup_buttons"),
+        })
+    except Exception as e:
+        safe_print(f"[popup] Snapshot failed: {e}")
+        snap = {"titles": [], "links": [], "buttons": []}
+
+    # Title extraction
+    title = ""
+    for item in snap["titles"]:
+        if item:
+            t = snapshot_label(item, max_len=200)
             if t:
                 title = t
                 break
 
     # Nested links in popup
     nested_links = []
-    anchors = popup.locator("a:visible")
-    count = min(anchors.count(), 20)
-    for i in range(count):
-        a = anchors.nth(i)
-        txt = safe_text(a, max_len=200)
-        href = normalize_href(page.url, a.get_attribute("href"))
+    for item in snap["links"]:
+        txt = snapshot_label(item, max_len=200)
+        href = normalize_href(page.url, item["href"])
         if txt and href:
             nested_links.append({"text": txt, "href": href})
 
     # Popup action buttons
     popup_buttons = []
-    buttons = popup.locator(
-        "button:visible, a:visible, [role='button']:visible, input[type='button']:visible"
-    )
     seen = set()
-    for i in range(min(buttons.count(), 10)):
-        b = buttons.nth(i)
-        label = safe_text(b, max_len=150)
+    for item in snap["buttons"]:
+        label = snapshot_label(item, max_len=150)
         if not label or label in seen:
             continue
         seen.add(label)
-        popup_buttons.append(label)
+        popup_buttons.append((label, item))
 
     return popup, title, popup_buttons, nested_links
 
 
-def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button_text: str):
+def _popup_button(page, popup, label: str, item: dict):
+    """Locator for a popup button: snapshot id first, label text if re-rendered."""
+    btn = snapshot_locator(page, item)
+    if btn.count() == 0:
+        btn = popup.locator(POPUP_BUTTON_SELECTOR, has_text=label)
+    return btn.first
+
+
+@traced("popup_reopen")
+def _reopen_popup(page, home: str, trigger_text: str, title: str, timings: dict):
+    """
+    Bring the popup opened by `trigger_text` back on the page we already have:
+    go back if a button navigated away, then click the trigger again.
+    Returns the popup locator, or None if it could not be reopened in place.
+    """
+    try:
+        if not same_page_path(page.url, home):
+            page.go_back(wait_until="domcontentloaded", timeout=15000)
+            if not same_page_path(page.url, home):
+                goto(page, home)
+            settle(page, "load", timings)
+
+        popup, current_title, _, _ = analyze_popup(page)
+        if popup is not None and current_title == title:
+            return popup
+
+        trigger = page.locator(INTERACTIVE_SELECTOR, has_text=trigger_text).first
+        if trigger.count() == 0:
+            return None
+        try:
+            trigger.scroll_into_view_if_needed(timeout=800)
+        except Exception:
+            pass
+        trigger.click(timeout=3000, force=True)
+        settle(page, "popup_open", timings)
+
+        popup, current_title, _, _ = analyze_popup(page)
+        if popup is not None and current_title == title:
+            return popup
+    except Exception as e:
+        safe_print(f"      [popup-btn] Reopen failed: {e}")
+    return None
+
+
+def _opens_new_tab(item: dict) -> bool:
+    return item["tag"] == "a" and (item.get("target") or "").lower() == "_blank" and bool(item["href"])
+
+
+@traced("popup_buttons")
+def explore_popup_buttons(browser, page, isolation, base_url: str, trigger_text: str,
+                          popup, title: str, buttons: list) -> list:
+    """
+    Classify every popup button on the page that already has the popup open.
+
+    Links opening a new tab leave the popup in place, so they are clicked
+    together and their tabs load in parallel. Every other button is clicked
+    in place and the popup is reopened on the same page afterwards. Only if
+    that reopen fails do the remaining buttons fall back to
+    test_popup_button_behavior() on a separate page. Buttons left when the
+    scan deadline passes are skipped.
+    Actions are returned in the order of `buttons`.
+    """
+    ctx = page.context
+    home = page.url
+    actions = {}
+    current = popup
+    phase = active_budget().phase("popup_buttons")
+
+    # 1) New-tab links: click them all, let the tabs load in parallel
+    opened = []
+    for label, item in buttons:
+        if not _opens_new_tab(item):
+            continue
+        if phase.exhausted():
+            break
+        if current is None or current.count() == 0:
+            current = _reopen_popup(page, home, trigger_text, title, {})
+            if current is None:
+                break
+        safe_print(f"      [popup-btn] trigger='{trigger_text}' button='{label}' (new tab)")
+        timings = {}
+        try:
+            with ctx.expect_page(timeout=5000) as info:
+                _popup_button(page, current, label, item).click(timeout=3000, force=True)
+            opened.append((label, info.value, timings))
+        except Exception:
+            # No tab after all: classify it with the in-place buttons
+            continue
+    for label, tab, timings in opened:
+        start = time.monotonic()
+        try:
+            tab.wait_for_load_state("domcontentloaded", timeout=5000)
+        except Exception:
+            pass
+        timings["popup_click"] = int((time.monotonic() - start) * 1000)
+        safe_print(f"        -> Opened new tab: {tab.url}")
+        actions[label] = {
+            "text": label,
+            "expected": "navigate_new_tab",
+            "target_url": tab.url,
+            "settle_ms": timings
+        }
+        try:
+            tab.close()
+        except Exception:
+            pass
+
+    # 2) Everything else: click in place, then reopen the popup
+    in_place_failed = False
+    for label, item in buttons:
+        if label in actions:
+            continue
+        if phase.exhausted():
+            phase.skip()
+            continue
+        if not in_place_failed and (current is None or current.count() == 0):
+            current = _reopen_popup(page, home, trigger_text, title, {})
+            if current is None:
+                safe_print("      [popup-btn] Could not reopen popup in place, using a separate page")
+                in_place_failed = True
+        if in_place_failed:
+            action = test_popup_button_behavior(browser, base_url, trigger_text, label, isolation)
+            if action:
+                actions[label] = action
+            continue
+
+        safe_print(f"      [popup-btn] trigger='{trigger_text}' button='{label}' (in place)")
+        timings = {}
+        before_pages = len(ctx.pages)
+        before_url = page.url
+        try:
+            _popup_button(page, current, label, item).click(timeout=3000, force=True)
+            settle(page, "popup_click", timings)
+        except Exception as e:
+            safe_print(f"        -> Error in popup button flow: {e}")
+
+        if len(ctx.pages) > before_pages:
+            tab = ctx.pages[-1]
+            try:
+                tab.wait_for_load_state("domcontentloaded", timeout=5000)
+            except Exception:
+                pass
+            safe_print(f"        -> Opened new tab: {tab.url}")
+            action = {"text": label, "expected": "navigate_new_tab", "target_url": tab.url}
+            for extra in ctx.pages[before_pages:]:
+                extra.close()
+        elif page.url != before_url:
+            safe_print(f"        -> Navigated to {page.url}")
+            action = {"text": label, "expected": "navigate", "target_url": page.url}
+        else:
+            safe_print("        -> Stayed on same page after button click")
+            action = {"text": label, "expected": "stay_on_same_page", "target_url": None}
+        action["settle_ms"] = timings
+        actions[label] = action
+        current = None  # popup state is unknown now, reopen before the next button
+
+    return [actions[label] for label, _ in buttons if label in actions]
+
+
+@traced("popup_button", label="button_text")
+def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button_text: str,
+                               isolation: PageIsolation | None = None):
     """
     For each popup button:
-      - Open new context
+      - Get a clean page (see PageIsolation)
       - Click trigger → open popup
       - Click that popup button
       - Classify: navigate / stay_on_same_page
     """
-    ctx = browser.new_context()
-    page = ctx.new_page()
+    if isolation is None:
+        isolation = PageIsolation(browser, base_url, mode="fresh")
     safe_print(f"      [popup-btn] trigger='{trigger_text}' button='{button_text}'")
 
     result = None
+    timings = {}
+    page = None
     try:
-        page.goto(base_url, wait_until="domcontentloaded", timeout=90000)
-        page.wait_for_timeout(1000)
-        auto_accept_cookies(page)
-        page.wait_for_timeout(500)
+        page = isolation.acquire(timings)
+        ctx = page.context
 
         trigger = page.locator(INTERACTIVE_SELECTOR, has_text=trigger_text).first
         if trigger.count() == 0:
             safe_print("        -> Trigger not found in fresh context")
-            ctx.close()
+            isolation.release(page)
             return None
 
         try:
@@ -224,21 +1303,18 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
 
         before_url = page.url
         trigger.click(timeout=3000, force=True)
-        page.wait_for_timeout(1500)
+        settle(page, "popup_open", timings)
 
         popup, _, _, _ = detect_popup_in_page(page)
         if not popup:
             safe_print("        -> Popup did not appear in fresh context")
-            ctx.close()
+            isolation.release(page)
             return None
 
-        btn = popup.locator(
-            "button:visible, a:visible, [role='button']:visible, input[type='button']:visible",
-            has_text=button_text
-        ).first
+        btn = popup.locator(POPUP_BUTTON_SELECTOR, has_text=button_text).first
         if btn.count() == 0:
             safe_print("        -> Button not found inside popup")
-            ctx.close()
+            isolation.release(page)
             return None
 
         try:
@@ -248,7 +1324,7 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
 
         before_btn_url = page.url
         btn.click(timeout=3000, force=True)
-        page.wait_for_timeout(2000)
+        settle(page, "popup_click", timings)
         after_btn_url = page.url
 
         pages = ctx.pages
@@ -265,9 +1341,10 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
             result = {
                 "text": button_text,
                 "expected": "navigate_new_tab",
-                "target_url": new_url
+                "target_url": new_url,
+                "settle_ms": timings
             }
-            ctx.close()
+            isolation.release(page)
             return result
 
         if after_btn_url != before_btn_url:
@@ -275,14 +1352,16 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
             result = {
                 "text": button_text,
                 "expected": "navigate",
-                "target_url": after_btn_url
+                "target_url": after_btn_url,
+                "settle_ms": timings
             }
         else:
             safe_print("        -> Stayed on same page after button click")
             result = {
                 "text": button_text,
                 "expected": "stay_on_same_page",
-                "target_url": None
+                "target_url": None,
+                "settle_ms": timings
             }
 
     except Exception as e:
@@ -290,10 +1369,12 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
         result = {
             "text": button_text,
             "expected": "stay_on_same_page",
-            "target_url": None
+            "target_url": None,
+            "settle_ms": timings
         }
 
-    ctx.close()
+    if page is not None:
+        isolation.release(page)
     return result
 
 
@@ -301,68 +1382,98 @@ def test_popup_button_behavior(browser, base_url: str, trigger_text: str, button
 # HOVER SCAN
 # ==========================
 
-def detect_hover_interactions(page):
+@traced("hover")
+def detect_hover_interactions(page, template_index: TemplateIndex | None = None, on_result=None):
     """
     Hover on nav/header items and capture new links revealed.
+    Triggers inside a header/nav already analyzed on another page are taken
+    from `template_index` instead of being hovered again. `on_result` is
+    called with every hover interaction as soon as it is found.
+    Of the remaining triggers only the highest-priority ones within the
+    "hover" budget are hovered, and hovering stops once the budget's time
+    is up.
     """
     hover_results = []
 
-    nav_items = page.locator(HOVER_TRIGGER_SELECTOR)
-    total = nav_items.count()
-    safe_print(f"[hover] Found {total} hover triggers")
+    nav_items = snapshot_elements(page, HOVER_TRIGGER_SELECTOR)
+    safe_print(f"[hover] Found {len(nav_items)} hover triggers")
 
+    triggers = []
     seen_triggers = set()
-
-    for i in range(total):
-        el = nav_items.nth(i)
-        try:
-            if not el.is_visible(timeout=400):
-                continue
-        except Exception:
-            continue
-
-        trigger_text = safe_text(el, max_len=100)
+    for item in nav_items:
+        trigger_text = snapshot_label(item, max_len=100)
         if not trigger_text or trigger_text in seen_triggers:
             continue
         seen_triggers.add(trigger_text)
+        triggers.append((trigger_text, item))
+
+    # Shared-component triggers are reused for free, so only the others
+    # compete for the budget
+    reused = {}
+    if template_index is not None:
+        for trigger_text, item in triggers:
+            known, cached = template_index.lookup("hover", item["component"], trigger_text)
+            if known:
+                reused[trigger_text] = cached
+    fresh = [t for t in triggers if t[0] not in reused]
+    phase = active_budget().phase("hover")
+    selected = {text for text, _ in prioritize(phase, fresh, nav_items)}
+    if len(selected) < len(fresh):
+        safe_print(f"[hover] Budget: hovering {len(selected)} of {len(fresh)} triggers")
+
+    use_observer = HOVER_DIFF_MODE == "observer" and install_hover_watch(page)
+
+    for trigger_text, item in triggers:
+        if trigger_text in reused:
+            safe_print(f"  [hover] Trigger: '{trigger_text}' (shared component, reused)")
+            cached = reused[trigger_text]
+            if cached:
+                hover_results.append(cached)
+                if on_result:
+                    on_result(cached)
+            continue
+        if trigger_text not in selected:
+            continue
+        if phase.exhausted():
+            phase.skip()
+            continue
 
         safe_print(f"  [hover] Trigger: '{trigger_text}'")
 
-        # links BEFORE hover
-        before_links = {}
-        anchors_before = page.locator("a:visible")
-        for j in range(anchors_before.count()):
-            a = anchors_before.nth(j)
-            href = normalize_href(page.url, a.get_attribute("href"))
-            if not href:
-                continue
-            txt = safe_text(a, max_len=200)
-            if not txt:
-                continue
-            before_links[href] = txt
+        # links BEFORE hover (observer mode only needs to catch up on changes)
+        if use_observer:
+            if hover_watch_flush(page, item["id"]) is None:
+                safe_print("    -> Hover watch lost, falling back to scan mode")
+                use_observer = False
+        if not use_observer:
+            before_links = snapshot_links(page)
 
         # perform hover
+        hover_ms = 0
         try:
-            el.hover(timeout=1000)
-            page.wait_for_timeout(800)
+            snapshot_locator(page, item).hover(timeout=1000)
+            hover_ms = settle(page, "hover")
         except Exception as e:
             safe_print(f"    -> Hover failed: {e}")
             continue
+        phase.mark_done()
 
         # links AFTER hover
-        after_links = {}
-        anchors_after = page.locator("a:visible")
-        for j in range(anchors_after.count()):
-            a = anchors_after.nth(j)
-            href = normalize_href(page.url, a.get_attribute("href"))
-            if not href:
-                continue
-            txt = safe_text(a, max_len=200)
-            if not txt:
-                continue
-            after_links[href] = txt
-
-        new_hrefs = set(after_links.keys()) - set(before_links.keys())
+        revealed_items = hover_watch_flush(page, item["id"]) if use_observer else None
+        reliable = True
+        if revealed_items is not None:
+            after_links = snapshot_links(page, revealed_items)
+            new_hrefs = list(after_links)
+        elif use_observer:
+            # No reliable baseline for this trigger; later triggers use scan mode
+            safe_print("    -> Hover watch lost, falling back to scan mode")
+            use_observer = False
+            reliable = False
+            after_links, new_hrefs = {}, []
+        else:
+            after_links = snapshot_links(page)
+            new_hrefs = [href for href in after_links if href not in before_links]
+        hover_entry = None
         if not new_hrefs:
             safe_print("    -> No new links revealed")
         else:
@@ -373,21 +1484,29 @@ def detect_hover_interactions(page):
                     "text": after_links[href],
                     "href": href
                 })
-            hover_results.append({
+            hover_entry = {
                 "trigger": {
                     "text": trigger_text,
                     "selector_hint": f"text={trigger_text}"
                 },
-                "revealed_links": revealed
-            })
+                "revealed_links": revealed,
+                "settle_ms": {"hover": hover_ms}
+            }
+            hover_results.append(hover_entry)
+            if on_result:
+                on_result(hover_entry)
+        if template_index is not None and reliable:
+            template_index.record("hover", item["component"], trigger_text, hover_entry)
 
         # move mouse away
         try:
             page.mouse.move(0, 0)
         except Exception:
             pass
-        page.wait_for_timeout(200)
+        settle(page, "hover_reset")
 
+    if phase.skipped:
+        safe_print(f"[hover] Out of time ({phase.stopped}), skipped {phase.skipped} trigger(s)")
     return hover_results
 
 
@@ -399,26 +1518,24 @@ def collect_base_clickables(page):
     """
     Collect unique clickable labels on the page (without clicking yet).
     """
+    return [label for label, _ in collect_base_clickable_items(page)]
+
+
+@traced("collect_clickables")
+def collect_base_clickable_items(page):
+    """collect_base_clickables() keeping each label's snapshot entry."""
     labels = []
     seen = set()
 
-    candidates = page.locator(INTERACTIVE_SELECTOR)
-    total = min(candidates.count(), 50)
-    safe_print(f"[base-scan] Found {total} clickable elements (capped)")
+    candidates = snapshot_elements(page, INTERACTIVE_SELECTOR, limit=MAX_CLICKABLES)
+    safe_print(f"[base-scan] Found {len(candidates)} clickable elements (capped)")
 
-    for i in range(total):
-        el = candidates.nth(i)
-        try:
-            if not el.is_visible(timeout=400):
-                continue
-        except Exception:
-            continue
-
-        label = safe_text(el, max_len=150)
+    for item in candidates:
+        label = snapshot_label(item, max_len=150)
         if not label or label in seen:
             continue
         seen.add(label)
-        labels.append(label)
+        labels.append((label, item))
 
     return labels
 
@@ -427,17 +1544,18 @@ def collect_base_clickables(page):
 # PER-CLICK ANALYSIS
 # ==========================
 
-def test_click_in_fresh_context(browser, base_url: str, trigger_text: str):
+@traced("click", label="trigger_text")
+def test_click_in_fresh_context(browser, base_url: str, trigger_text: str,
+                                isolation: PageIsolation | None = None):
     """
     For one clickable label:
-      - new context
-      - load base page
+      - get a clean page at the base URL (see PageIsolation)
       - click element with that text
       - classify: popup / navigate / navigate_internal / scroll / none
       - if popup: analyze title + nested links + popup button behaviors
     """
-    ctx = browser.new_context()
-    page = ctx.new_page()
+    if isolation is None:
+        isolation = PageIsolation(browser, base_url, mode="fresh")
     safe_print(f"[click-test] Trigger: '{trigger_text}'")
 
     interaction = {
@@ -447,19 +1565,19 @@ def test_click_in_fresh_context(browser, base_url: str, trigger_text: str):
         },
         "result": {
             "type": "none"
-        }
+        },
+        "settle_ms": {}
     }
+    timings = interaction["settle_ms"]
 
+    page = None
     try:
-        page.goto(base_url, wait_until="domcontentloaded", timeout=90000)
-        page.wait_for_timeout(1000)
-        auto_accept_cookies(page)
-        page.wait_for_timeout(500)
+        page = isolation.acquire(timings)
 
         el = page.locator(INTERACTIVE_SELECTOR, has_text=trigger_text).first
         if el.count() == 0:
             safe_print("  -> Trigger not found in fresh context")
-            ctx.close()
+            isolation.release(page)
             return None
 
         try:
@@ -474,22 +1592,20 @@ def test_click_in_fresh_context(browser, base_url: str, trigger_text: str):
             el.click(timeout=3000, force=True)
         except Exception as e:
             safe_print(f"  -> Click failed: {e}")
-            ctx.close()
+            isolation.release(page)
             return None
 
-        page.wait_for_timeout(2000)
+        settle(page, "click", timings)
 
         # 1) Check for popup first
-        popup, title, popup_buttons, nested_links = detect_popup_in_page(page)
+        popup, title, popup_buttons, nested_links = analyze_popup(page)
         if popup:
             safe_print(f"  -> Popup detected with title: '{title}'")
             actions = []
             if popup_buttons:
-                for btn_label in popup_buttons:
-                    safe_print(f"    -> Testing popup button '{btn_label}'")
-                    action = test_popup_button_behavior(browser, base_url, trigger_text, btn_label)
-                    if action:
-                        actions.append(action)
+                actions = explore_popup_buttons(
+                    browser, page, isolation, base_url, trigger_text, popup, title, popup_buttons
+                )
 
             interaction["result"] = {
                 "type": "popup",
@@ -497,7 +1613,7 @@ def test_click_in_fresh_context(browser, base_url: str, trigger_text: str):
                 "actions": actions,
                 "nested_links": nested_links or []
             }
-            ctx.close()
+            isolation.release(page)
             return interaction
 
         # 2) No popup: check navigation vs scroll
@@ -536,52 +1652,332 @@ def test_click_in_fresh_context(browser, base_url: str, trigger_text: str):
     except Exception as e:
         safe_print(f"  -> Error during click test: {e}")
 
-    ctx.close()
+    if page is not None:
+        isolation.release(page)
     return interaction
 
 
+# ==========================
+# PARALLEL CLICK ANALYSIS
+# ==========================
+
+def launch_browser(p, headless: bool | None = None):
+    """Launch the Chromium instance used for scanning (see LAUNCH_PROFILE)."""
+    profile = LAUNCH_PROFILES[LAUNCH_PROFILE]
+    return p.chromium.launch(
+        headless=profile["headless"] if headless is None else headless,
+        args=profile.get("args", []),
+    )
+
+
+def _click_worker(base_url: str, jobs: "queue.Queue", results: dict, lock: threading.Lock,
+                  isolation_opts: dict, on_result=None, metrics: ScanMetrics | None = None,
+                  budget: ScanBudget | None = None) -> None:
+    """
+    Worker thread: owns its own Playwright driver + browser (the sync API
+    is not thread-safe) and pulls (index, label) jobs until the queue is empty
+    or the scan's `budget` for click tests is used up.
+    Spans and round trips go to the scan's `metrics`.
+    """
+    with activate(metrics), activate_budget(budget), sync_playwright() as p:
+        with span("launch"):
+            browser = launch_browser(p)
+        isolation = PageIsolation(browser, base_url, **isolation_opts)
+        phase = active_budget().phase("click_tests")
+        try:
+            while True:
+                try:
+                    idx, label = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if phase.exhausted():
+                    phase.skip()
+                    continue
+                try:
+                    interaction = test_click_in_fresh_context(browser, base_url, label, isolation)
+                except Exception as e:
+                    safe_print(f"[click-worker] '{label}' failed: {e}")
+                    interaction = None
+                phase.mark_done()
+                with lock:
+                    results[idx] = interaction
+                if interaction and on_result:
+                    on_result(interaction)
+        finally:
+            isolation.close()
+            browser.close()
+
+
+@traced("click_tests")
+def run_click_tests(browser, base_url: str, labels: list, workers: int = 1,
+                    isolation_opts: dict | None = None, on_result=None) -> list:
+    """
+    Run test_click_in_fresh_context for every label.
+
+    With workers <= 1 the labels are processed one after another on `browser`.
+    Otherwise the labels are spread over `workers` threads, each with its own
+    browser. Results are always returned in the order of `labels`, with
+    labels that produced no interaction dropped. `isolation_opts` are passed
+    to the PageIsolation of each worker. `on_result` is called with every
+    interaction as soon as its test finishes (in completion order, possibly
+    from a worker thread). Labels not started before the "click_tests"
+    budget runs out are skipped.
+    """
+    isolation_opts = isolation_opts or {}
+    phase = active_budget().phase("click_tests")
+    if workers <= 1 or len(labels) <= 1:
+        isolation = PageIsolation(browser, base_url, **isolation_opts)
+        interactions = []
+        try:
+            for n, label in enumerate(labels):
+                if phase.exhausted():
+                    phase.skip(len(labels) - n)
+                    safe_print(f"[click-test] Out of time ({phase.stopped}), skipping {len(labels) - n} label(s)")
+                    break
+                interaction = test_click_in_fresh_context(browser, base_url, label, isolation)
+                phase.mark_done()
+                if interaction:
+                    interactions.append(interaction)
+                    if on_result:
+                        on_result(interaction)
+        finally:
+            isolation.close()
+        return interactions
+
+    workers = min(workers, len(labels))
+    safe_print(f"[click-test] Running {len(labels)} click tests on {workers} workers")
+
+    jobs = queue.Queue()
+    for idx, label in enumerate(labels):
+        jobs.put((idx, label))
+
+    results = {}
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_click_worker, base_url, jobs, results, lock, isolation_opts, on_result,
+                        current(), current_budget())
+            for _ in range(workers)
+        ]
+        for f in futures:
+            f.result()
+    if phase.skipped:
+        safe_print(f"[click-test] Out of time ({phase.stopped}), skipped {phase.skipped} label(s)")
+
+    return [results[idx] for idx in range(len(labels)) if results.get(idx)]
+
+
 # ==========================
 # MAIN SCAN
 # ==========================
 
-def scan_homepage(url: str):
+def scan_homepage(url: str, workers: int = CLICK_WORKERS, isolation: str = ISOLATION_MODE,
+                  cache_dir: str | None = None, template_index: TemplateIndex | None = None,
+                  on_event=None, browser=None):
+    """
+    Scan one page for hover and click interactions. When scanning several
+    pages of a site, pass one `template_index` to all scans so triggers in
+    shared headers/navs/footers are only analyzed once.
+
+    `on_event` receives every finished interaction while the scan is still
+    running (see scan_event()), followed by a final "done" event.
+
+    Pass an already launched `browser` (e.g. from a BrowserPool) to skip
+    the launch; it is left open and must belong to the calling thread.
+
+    Per-phase timings, round trips and context/byte counts are returned in
+    the "metrics" block (see scan_metrics.ScanMetrics.summary()), and the
+    individual spans are written to TRACE_PATH when it is set.
+
+    The scan stays within SCAN_BUDGETS and SCAN_DEADLINE: phases that run
+    out of time stop early and whatever was found so far is returned, with
+    "budget"["partial"] set (see scan_budget.ScanBudget.report()).
+    """
+    metrics = ScanMetrics()
+    budget = ScanBudget(SCAN_DEADLINE, SCAN_BUDGETS)
+    with activate(metrics), activate_budget(budget):
+        if browser is None:
+            with sync_playwright() as p:
+                with span("launch"):
+                    browser = launch_browser(p)
+                try:
+                    return _scan_page(browser, url, workers, isolation, cache_dir, template_index, on_event)
+                finally:
+                    browser.close()
+        return _scan_page(browser, url, workers, isolation, cache_dir, template_index, on_event)
+
+
+def _scan_page(browser, url: str, workers: int, isolation: str, cache_dir: str | None,
+               template_index: TemplateIndex | None, on_event) -> dict:
+    emit_hover = (lambda i: on_event(scan_event("hover", url, i))) if on_event else None
+    emit_click = (lambda i: on_event(scan_event("click", url, i))) if on_event else None
+
     result = {
         "page_url": url,
         "hover_interactions": [],
-        "click_interactions": []
+        "click_interactions": [],
+        "settle_mode": SETTLE_MODE,
+        "launch_profile": LAUNCH_PROFILE,
+        "settle_ms": {}
     }
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+    # Shared by every context of this scan (and all click workers)
+    cache = ResponseCache(cache_dir=cache_dir)
 
-        # 1) Base load for hover + clickable label discovery
-        base_ctx = browser.new_context()
+    # 1) Base load for hover + clickable label discovery
+    base_ctx = new_scan_context(browser, url, cache)
+    try:
         base_page = base_ctx.new_page()
+        watch_network(base_page)
 
         safe_print(f"[start] Loading base page: {url}")
-        base_page.goto(url, wait_until="domcontentloaded", timeout=90000)
-        base_page.wait_for_timeout(1500)
-        auto_accept_cookies(base_page)
-        base_page.wait_for_timeout(500)
+        with span("base_load"):
+            goto(base_page, url)
+            settle(base_page, "base_load", result["settle_ms"])
+        auto_accept_cookies(base_page, result["settle_ms"], verify=True)
+        settle(base_page, "cookie", result["settle_ms"])
+
+        # Post-cookie state + fingerprint let click tests skip the banner and
+        # verify that restored/reset pages match what we scanned here
+        isolation_opts = {"mode": isolation, "baseline": page_fingerprint(base_page), "cache": cache}
+        if isolation != "fresh":
+            try:
+                with span("storage_state"):
+                    isolation_opts["storage_state"] = base_ctx.storage_state()
+            except Exception as e:
+                safe_print(f"[isolation] Could not capture storage state: {e}")
 
         # Hover interactions
-        hover_data = detect_hover_interactions(base_page)
+        hover_data = detect_hover_interactions(base_page, template_index, emit_hover)
         result["hover_interactions"] = hover_data
 
         # Clickable labels
-        base_clickables = collect_base_clickables(base_page)
+        base_clickables = collect_base_clickable_items(base_page)
         safe_print(f"[base-scan] Unique trigger labels collected: {len(base_clickables)}")
-
+    finally:
+        # Closed even on failure: a shared browser outlives this scan
         base_ctx.close()
 
-        # 2) Analyze each clickable label in a fresh context
-        for label in base_clickables:
-            interaction = test_click_in_fresh_context(browser, url, label)
-            if interaction:
-                result["click_interactions"].append(interaction)
+    # Labels inside components already analyzed on another page
+    reused = {}
+    if template_index is not None:
+        for label, item in base_clickables:
+            known, cached = template_index.lookup("click", item["component"], label)
+            if known:
+                reused[label] = cached
+        if reused:
+            safe_print(f"[template] Reusing {len(reused)} click result(s) from shared components")
+            if emit_click:
+                for interaction in reused.values():
+                    emit_click(interaction)
+
+    # Only labels that are not reused compete for the click-test budget
+    fresh = [(label, item) for label, item in base_clickables if label not in reused]
+    selected = prioritize(active_budget().phase("click_tests"), fresh, [item for _, item in base_clickables])
+    if len(selected) < len(fresh):
+        safe_print(f"[base-scan] Budget: testing {len(selected)} of {len(fresh)} labels by priority")
+
+    # 2) Analyze each remaining clickable label in a fresh context
+    to_test = [label for label, _ in selected]
+    tested = {
+        i["trigger"]["text"]: i
+        for i in run_click_tests(browser, url, to_test, workers, isolation_opts, emit_click)
+    }
+    if template_index is not None:
+        for label, item in base_clickables:
+            if label in tested:
+                template_index.record("click", item["component"], label, tested[label])
+
+    result["click_interactions"] = [
+        reused.get(label) or tested[label]
+        for label, _ in base_clickables
+        if label in reused or label in tested
+    ]
+
+    cache.save()
+    result["network"] = cache.stats()
+    safe_print(f"[network] {result['network']}")
+
+    result["budget"] = active_budget().report()
+    if result["budget"]["partial"]:
+        safe_print(
+            "[budget] Partial scan: "
+            + ", ".join(f"{name} stopped by {p['stopped']} ({p['skipped']} skipped)"
+                        for name, p in result["budget"]["phases"].items() if p["stopped"])
+        )
+
+    metrics = current()
+    if metrics is not None:
+        result["metrics"] = metrics.summary()
+        safe_print(
+            f"[metrics] {result['metrics']['total_ms']}ms, "
+            f"{result['metrics']['round_trips']['total']} round trips: "
+            + ", ".join(f"{p['name']} {p['ms']}ms" for p in result["metrics"]["phases"])
+        )
+        if TRACE_PATH:
+            metrics.write_trace(TRACE_PATH, label=url)
+            safe_print(f"[metrics] Trace written to {TRACE_PATH}")
+    if on_event:
+        on_event(scan_event("done", url, result))
+    return result
+
+
+def scan_event(kind: str, page_url: str, data: dict) -> dict:
+    """
+    Streaming scan event: "hover" / "click" carry one interaction, "done"
+    carries the complete scan result.
+    """
+    key = "result" if kind == "done" else "interaction"
+    return {"event": kind, "page_url": page_url, key: data}
 
-        browser.close()
 
+# ==========================
+# CACHED SCAN
+# ==========================
+
+def scan_variant() -> str:
+    """The scanner settings that change what a scan finds, as a ScanCache variant."""
+    return json.dumps(
+        {"profile": LAUNCH_PROFILE, "budgets": SCAN_BUDGETS, "deadline": SCAN_DEADLINE}, sort_keys=True
+    )
+
+
+def scan_with_cache(url: str, refresh: bool = False, cache: ScanCache | None = None, **scan_kwargs):
+    """
+    scan_homepage() behind the persistent ScanCache: if the page's
+    http_fingerprint() still matches a stored, unexpired scan, that scan is
+    returned without launching a browser. `refresh` forces a new scan (the
+    result still replaces the cached one). Scans made with a different
+    launch profile or budget (see scan_variant()) are cached separately.
+    """
+    cache = cache or ScanCache()
+    canonical = canonicalize_url(url, url) or url
+    fingerprint = http_fingerprint(url)
+    variant = scan_variant()
+
+    if not refresh:
+        hit = cache.get(canonical, fingerprint, variant)
+        if hit is not None:
+            result, created = hit
+            stored_at = datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="seconds")
+            safe_print(f"[scan-cache] Hit for {canonical} (scanned {stored_at})")
+            result["scan_cache"] = {"hit": True, "stored_at": stored_at}
+            on_event = scan_kwargs.get("on_event")
+            if on_event:
+                for interaction in result["hover_interactions"]:
+                    on_event(scan_event("hover", url, interaction))
+                for interaction in result["click_interactions"]:
+                    on_event(scan_event("click", url, interaction))
+                on_event(scan_event("done", url, result))
+            return result
+
+    result = scan_homepage(url, **scan_kwargs)
+    if result.get("budget", {}).get("partial"):
+        # A cut-short scan depends on how fast the site was this time
+        safe_print(f"[scan-cache] Not caching partial scan of {canonical}")
+    else:
+        cache.put(canonical, fingerprint, result, variant)
+    result["scan_cache"] = {"hit": False, "fingerprint": fingerprint}
     return result
 
 
@@ -589,17 +1985,111 @@ def scan_homepage(url: str):
 # ENTRY POINT
 # ==========================
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a page for hover/click interactions.")
+    parser.add_argument("url", nargs="?", default="https://www.tivdak.com/patient-stories/")
+    parser.add_argument(
+        "--workers", type=int, default=CLICK_WORKERS,
+        help="number of parallel browsers for click analysis (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--settle", choices=["event", "fixed"], default=SETTLE_MODE,
+        help="how to wait for interactions to finish (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--hover-diff", choices=["observer", "scan"], default=HOVER_DIFF_MODE,
+        help="how hover-revealed links are detected (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--isolation", choices=["storage_state", "reuse_page", "fresh"], default=ISOLATION_MODE,
+        help="how click tests get a clean page (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--profile", choices=sorted(LAUNCH_PROFILES), default=LAUNCH_PROFILE,
+        help="browser launch profile: default (headless), headed or lean (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help="keep the static asset cache on disk here (default: in memory, per scan)"
+    )
+    parser.add_argument(
+        "--no-block", action="store_true",
+        help="don't block analytics, ads and media requests"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="ignore the scan cache and scan the page again"
+    )
+    parser.add_argument(
+        "--no-scan-cache", action="store_true",
+        help="don't read or write the persistent scan cache"
+    )
+    parser.add_argument(
+        "--storage-state", default=None, metavar="PATH",
+        help="start every browser context from this Playwright storage state (e.g. consent cookies)"
+    )
+    parser.add_argument(
+        "--trace", default=None, metavar="PATH",
+        help="write the scan's timing spans to PATH (Chrome trace for .json, JSON lines otherwise)"
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=SCAN_DEADLINE,
+        help="stop the scan after this many seconds and return partial results, 0 for none (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--max-hovers", type=int, default=SCAN_BUDGETS["hover"]["max_elements"],
+        help="hover at most this many nav/header triggers, by priority (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--max-clicks", type=int, default=SCAN_BUDGETS["click_tests"]["max_elements"],
+        help="click-test at most this many labels, by priority (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--output", default=SCAN_OUTPUT_PATH,
+        help="where to write the scan JSON (default: %(default)s, the generator's default input)"
+    )
+    parser.add_argument(
+        "--ndjson", action="store_true",
+        help="stream each finished interaction to stdout as a JSON line (logs go to stderr)"
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        start_url = sys.argv[1]
+    args = parse_args()
+    SETTLE_MODE = args.settle
+    HOVER_DIFF_MODE = args.hover_diff
+    BLOCK_REQUESTS = not args.no_block
+    LAUNCH_PROFILE = args.profile
+    TRACE_PATH = args.trace
+    COOKIE_STORAGE_STATE = args.storage_state
+    SCAN_DEADLINE = args.deadline or None
+    SCAN_BUDGETS["hover"]["max_elements"] = args.max_hovers
+    SCAN_BUDGETS["click_tests"]["max_elements"] = args.max_clicks
+
+    scan_kwargs = {"workers": args.workers, "isolation": args.isolation, "cache_dir": args.cache_dir}
+    if args.ndjson:
+        LOG_STREAM = sys.stderr
+        stdout_lock = threading.Lock()
+
+        def print_event(event):
+            line = json.dumps(event, ensure_ascii=False)
+            with stdout_lock:
+                sys.stdout.write(line + "\n")
+                sys.stdout.flush()
+
+        scan_kwargs["on_event"] = print_event
+    if args.no_scan_cache:
+        data = scan_homepage(args.url, **scan_kwargs)
     else:
-        start_url = "https://www.tivdak.com/patient-stories/"
-
-    data = scan_homepage(start_url)
+        data = scan_with_cache(args.url, refresh=args.refresh, **scan_kwargs)
 
-    with open("homepage_interactions.json", "w", encoding="utf-8") as f:
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-    safe_print("\n=== FINAL HOMEPAGE INTERACTION MAP ===")
-    safe_print(json.dumps(data, indent=2, ensure_ascii=False))
-    safe_print("Saved to homepage_interactions.json")
+    if not args.ndjson:
+        safe_print("\n=== FINAL HOMEPAGE INTERACTION MAP ===")
+        safe_print(json.dumps(data, indent=2, ensure_ascii=False))
+    safe_print(f"Saved to {args.output}")
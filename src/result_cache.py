@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import Request, urlopen
+
+# ==========================
+# CONFIG
+# ==========================
+
+SCAN_CACHE_PATH = "data/scan_cache.sqlite"
+SCAN_CACHE_TTL = 24 * 60 * 60   # seconds
+SCAN_CACHE_MAX_ENTRIES = 500
+
+# Bump when the scan result format changes so old entries stop matching
+SCAN_CACHE_VERSION = 1
+
+LLM_CACHE_PATH = "data/llm_cache.sqlite"
+LLM_CACHE_TTL = 30 * 24 * 60 * 60   # seconds
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+FINGERPRINT_TIMEOUT = 10                 # seconds
+FINGERPRINT_MAX_BYTES = 2 * 1024 * 1024
+
+# Parts of an HTML document that change on every request without changing
+# the page: inline scripts/styles, comments, nonces and CSRF tokens.
+_VOLATILE_HTML = [
+    re.compile(r"<script\b.*?</script>", re.I | re.S),
+    re.compile(r"<style\b.*?</style>", re.I | re.S),
+    re.compile(r"<!--.*?-->", re.S),
+    re.compile(r"""\snonce=("[^"]*"|'[^']*')""", re.I),
+    re.compile(r"""<input[^>]*name=["'][^"']*(csrf|token)[^"']*["'][^>]*>""", re.I),
+    re.compile(r"""<meta[^>]*name=["'][^"']*(csrf|token)[^"']*["'][^>]*>""", re.I),
+]
+
+
+# ==========================
+# FINGERPRINT
+# ==========================
+
+def http_fingerprint(url: str) -> str | None:
+    """
+    Cheap "has this page changed" check without a browser: the ETag if the
+    server sends one, otherwise a hash of the HTML with volatile parts
+    stripped. None if the page could not be fetched.
+    """
+    req = Request(url, headers={"User-Agent": "Mozilla/5.0 (gherkin-generator scan cache)"})
+    try:
+        with urlopen(req, timeout=FINGERPRINT_TIMEOUT) as resp:
+            etag = resp.headers.get("ETag")
+            if etag:
+                return f"etag:{etag}"
+            body = resp.read(FINGERPRINT_MAX_BYTES).decode("utf-8", "ignore")
+    except Exception:
+        return None
+    for pattern in _VOLATILE_HTML:
+        body = pattern.sub("", body)
+    body = " ".join(body.split())
+    return "html:" + hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+# ==========================
+# SQLITE CACHE
+# ==========================
+
+class SqliteCache:
+    """
+    Small key/value cache in one SQLite table, with TTL expiry and LRU
+    eviction by entry count. A connection is opened per operation, so one
+    instance can be used from several threads.
+    """
+
+    TABLE = "entries"
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                "key TEXT PRIMARY KEY, tag TEXT, created REAL, accessed REAL, value TEXT)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:  # commit / rollback
+                yield db
+        finally:
+            db.close()
+
+    def get_entry(self, key: str, tag: str | None = None):
+        """(value, created) for a live entry whose tag matches, else None."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT tag, created, value FROM {self.TABLE} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count(hit=False)
+                return None
+            stored_tag, created, value = row
+            if now - created > self.ttl or (tag is not None and stored_tag != tag):
+                db.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+                self._count(hit=False)
+                return None
+            db.execute(f"UPDATE {self.TABLE} SET accessed = ? WHERE key = ?", (now, key))
+        self._count(hit=True)
+        return value, created
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put_entry(self, key: str, value: str, tag: str | None = None) -> None:
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} (key, tag, created, accessed, value) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, tag, now, now, value),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db, now: float) -> None:
+        db.execute(f"DELETE FROM {self.TABLE} WHERE created < ?", (now - self.ttl,))
+        db.execute(
+            f"DELETE FROM {self.TABLE} WHERE key NOT IN "
+            f"(SELECT key FROM {self.TABLE} ORDER BY accessed DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        with self._connect() as db:
+            entries = db.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+class ScanCache(SqliteCache):
+    """
+    Finished scan results keyed by canonical URL and the scanner settings
+    they were produced with (`variant`, e.g. launch profile and budgets).
+    Each entry is tagged with the page's http_fingerprint(), so a changed
+    page is a miss even within the TTL.
+    """
+
+    TABLE = "scans"
+
+    def __init__(self, path: str = SCAN_CACHE_PATH, ttl: float = SCAN_CACHE_TTL,
+                 max_entries: int = SCAN_CACHE_MAX_ENTRIES):
+        super().__init__(path, ttl, max_entries)
+
+    @staticmethod
+    def key(canonical_url: str, variant: str = "") -> str:
+        return hashlib.sha256(f"v{SCAN_CACHE_VERSION}|{canonical_url}|{variant}".encode("utf-8")).hexdigest()
+
+    def get(self, canonical_url: str, fingerprint: str | None, variant: str = ""):
+        """(scan result, created timestamp) or None."""
+        if fingerprint is None:
+            return None
+        entry = self.get_entry(self.key(canonical_url, variant), fingerprint)
+        if entry is None:
+            return None
+        value, created = entry
+        return json.loads(value), created
+
+    def put(self, canonical_url: str, fingerprint: str | None, result: dict, variant: str = "") -> None:
+        if fingerprint is None:
+            return
+        self.put_entry(self.key(canonical_url, variant), json.dumps(result, ensure_ascii=False), fingerprint)
+
+
+class LLMCache(SqliteCache):
+    """
+    Generated Gherkin keyed by a hash of the normalized chat request (model,
+    sampling parameters, system prompt and user message), so an identical
+    request -- including one chunk of an otherwise changed scan -- is
+    answered without calling the API. Besides TTL and entry-count eviction,
+    the least recently used entries are dropped once the stored responses
+    exceed `max_bytes`.
+    """
+
+    TABLE = "llm_responses"
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        super().__init__(path, ttl, max_entries)
+
+    @staticmethod
+    def key(request: dict) -> str:
+        normalized = dict(request)
+        normalized["messages"] = [
+            {"role": m["role"], "content": "\n".join(line.rstrip() for line in m["content"].strip().splitlines())}
+            for m in request["messages"]
+        ]
+        payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, request: dict) -> str | None:
+        entry = self.get_entry(self.key(request))
+        return None if entry is None else entry[0]
+
+    def put(self, request: dict, response: str) -> None:
+        self.put_entry(self.key(request), response)
+
+    def _evict(self, db, now: float) -> None:
+        super()._evict(db, now)
+        total = db.execute(f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.TABLE}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute(f"SELECT key, LENGTH(value) FROM {self.TABLE} ORDER BY accessed ASC").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        db.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", stale)
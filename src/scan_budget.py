@@ -0,0 +1,215 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# ==========================
+# CONFIG
+# ==========================
+
+# Priority weights of the cheap element score (see priority())
+PRIORITY_WEIGHTS = {
+    "nav": 3,            # inside header/nav
+    "footer": -2,        # inside footer
+    "above_fold": 2,     # top edge within the first viewport
+    "button": 2,         # buttons open popups/menus more often than links
+    "haspopup": 3,       # aria-haspopup / aria-expanded
+    "unique_href": 2,    # the only candidate pointing at its href
+    "duplicate_href": -1,  # per other candidate sharing the href
+    "no_action": -4,     # mailto:, tel:, javascript: links
+}
+FOLD_PX = 900
+
+_local = threading.local()    # .budget of the current thread
+
+
+# ==========================
+# PRIORITY
+# ==========================
+
+def link_target(item: dict) -> str | None:
+    """
+    Resolved URL (without fragment) a snapshot entry links to, or None for
+    no href and in-page "#..." anchors. "/about", "about" and
+    "https://host/about" on the same page are the same target.
+    """
+    href = (item.get("href") or "").strip()
+    if not href or href.startswith("#"):
+        return None
+    return item.get("url") or href.split("#")[0]
+
+
+def href_counts(items: list) -> dict:
+    counts = {}
+    for item in items:
+        target = link_target(item)
+        if target:
+            counts[target] = counts.get(target, 0) + 1
+    return counts
+
+
+def priority(item: dict, counts: dict) -> int:
+    """
+    Cheap score of a snapshot entry (see playwright_interactions.snapshot_elements):
+    where it sits on the page, whether it looks like it opens something
+    and how unique its target is. Higher is tested first.
+    """
+    w = PRIORITY_WEIGHTS
+    score = 0
+    region = item.get("region")
+    if region == "nav":
+        score += w["nav"]
+    elif region == "footer":
+        score += w["footer"]
+    box = item.get("box") or {}
+    if box.get("y", FOLD_PX) < FOLD_PX:
+        score += w["above_fold"]
+    if item.get("tag") == "button" or item.get("role") == "button":
+        score += w["button"]
+    if item.get("haspopup"):
+        score += w["haspopup"]
+    href = (item.get("href") or "").strip()
+    target = link_target(item)
+    if href.lower().startswith(("mailto:", "tel:", "javascript:")):
+        score += w["no_action"]
+    elif target:
+        n = counts.get(target, 1)
+        score += w["unique_href"] if n == 1 else w["duplicate_href"] * (n - 1)
+    return score
+
+
+# ==========================
+# BUDGETS
+# ==========================
+
+class PhaseBudget:
+    """
+    Element and time budget of one scan phase. select() keeps the
+    highest-priority candidates within `max_elements`; exhausted() tells the
+    phase to stop once its own `max_seconds` or the scan deadline is over.
+    """
+
+    def __init__(self, name: str, max_elements: int | None, max_seconds: float | None,
+                 scan_deadline: float | None):
+        self.name = name
+        self.max_elements = max_elements
+        self.started = time.monotonic()
+        deadlines = [d for d in (scan_deadline, self.started + max_seconds if max_seconds else None) if d]
+        self.deadline = min(deadlines) if deadlines else None
+        self._scan_deadline = scan_deadline
+        self.considered = 0
+        self.selected = 0
+        self.done = 0
+        self.skipped = 0
+        self.stopped = None   # "time budget" / "scan deadline" once exhausted
+        self._lock = threading.Lock()
+
+    def select(self, items: list, score=None) -> list:
+        """
+        The `max_elements` best `items` by `score` (ties and the result keep
+        document order).
+        """
+        self.considered += len(items)
+        if self.max_elements is None or len(items) <= self.max_elements:
+            chosen = list(items)
+        else:
+            ranked = sorted(range(len(items)), key=lambda i: -score(items[i]) if score else 0)
+            keep = sorted(ranked[:self.max_elements])
+            chosen = [items[i] for i in keep]
+        self.selected += len(chosen)
+        return chosen
+
+    def exhausted(self) -> bool:
+        if self.stopped:
+            return True
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return False
+        with self._lock:
+            if not self.stopped:
+                at_scan_deadline = self._scan_deadline is not None and self.deadline >= self._scan_deadline
+                self.stopped = "scan deadline" if at_scan_deadline else "time budget"
+        return True
+
+    def mark_done(self, n: int = 1) -> None:
+        with self._lock:
+            self.done += n
+
+    def skip(self, n: int = 1) -> None:
+        """Count `n` selected elements left out because the phase ran out of time."""
+        with self._lock:
+            self.skipped += n
+
+    def report(self) -> dict:
+        return {
+            "considered": self.considered,
+            "selected": self.selected,
+            "done": self.done,
+            "skipped": self.skipped,
+            "stopped": self.stopped,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+        }
+
+
+class ScanBudget:
+    """
+    Budgets of one scan: a global deadline (`deadline_s` from creation, None
+    for none) and per-phase {"max_elements", "max_seconds"} limits. Phases
+    that run out of time stop early and the scan is reported as partial
+    instead of failing. Safe to share across click-worker threads.
+    """
+
+    def __init__(self, deadline_s: float | None, budgets: dict):
+        self.deadline_s = deadline_s
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_s if deadline_s else None
+        self.budgets = budgets
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> PhaseBudget:
+        with self._lock:
+            if name not in self._phases:
+                limits = self.budgets.get(name, {})
+                self._phases[name] = PhaseBudget(
+                    name, limits.get("max_elements"), limits.get("max_seconds"), self.deadline
+                )
+            return self._phases[name]
+
+    def limit(self, name: str) -> int | None:
+        """Element cap of a phase that only selects (e.g. popup links)."""
+        return self.budgets.get(name, {}).get("max_elements")
+
+    def remaining(self) -> float | None:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def timeout_ms(self, default_ms: int) -> int:
+        """`default_ms` capped at the time left before the deadline (at least one second)."""
+        remaining = self.remaining()
+        return default_ms if remaining is None else max(1000, min(default_ms, int(remaining * 1000)))
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = {name: phase.report() for name, phase in self._phases.items()}
+        return {
+            "deadline_s": self.deadline_s,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "partial": any(p["stopped"] for p in phases.values()),
+            "phases": phases,
+        }
+
+
+def current_budget() -> ScanBudget | None:
+    return getattr(_local, "budget", None)
+
+
+@contextmanager
+def activate_budget(budget: ScanBudget | None):
+    """Make `budget` the budget of the calling thread for the duration of the block."""
+    previous = current_budget()
+    _local.budget = budget
+    try:
+        yield budget
+    finally:
+        _local.budget = previous
@@ -0,0 +1,179 @@
+import argparse
+import json
+import math
+from urllib.parse import urlparse
+
+# ==========================
+# CONFIG
+# ==========================
+
+# "min": compact JSON objects, "table": links as [text, url] rows,
+# "json": the raw scan with indent=2 (no compaction)
+PROMPT_STYLES = ("min", "table", "json")
+DEFAULT_PROMPT_STYLE = "min"
+
+
+# ==========================
+# UTILITIES
+# ==========================
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def origin_of(url: str) -> str:
+    parsed = urlparse(url or "")
+    return f"{parsed.scheme}://{parsed.netloc}" if parsed.scheme and parsed.netloc else ""
+
+
+def relative_url(url: str | None, base: str) -> str | None:
+    """`url` without the common origin (kept whole when it is elsewhere)."""
+    if url and base and url.startswith(base + "/"):
+        return url[len(base):]
+    if url == base:
+        return "/"
+    return url
+
+
+# ==========================
+# COMPACTION
+# ==========================
+
+def _trigger_text(interaction: dict):
+    """The trigger label, plus the selector hint only when it is not derivable."""
+    trigger = interaction["trigger"]
+    hint = trigger.get("selector_hint")
+    if hint and hint != f"text={trigger['text']}":
+        return {"text": trigger["text"], "selector_hint": hint}
+    return trigger["text"]
+
+
+def _link(link: dict, base: str, style: str):
+    href = relative_url(link["href"], base)
+    return [link["text"], href] if style == "table" else {"text": link["text"], "href": href}
+
+
+def compact_hovers(hovers: list, base: str, style: str) -> list:
+    """
+    Hover interactions with derivable fields removed, links deduplicated by
+    href and menus revealing exactly the same links (e.g. "Results" and
+    "Click to expand Results menu") merged under one entry with several
+    triggers.
+    """
+    menus = []
+    by_links = {}
+    for hover in hovers:
+        links = []
+        seen = set()
+        for link in hover.get("revealed_links", []):
+            if link["href"] not in seen:
+                seen.add(link["href"])
+                links.append(link)
+        key = tuple(sorted(seen))
+        if key in by_links:
+            by_links[key]["triggers"].append(_trigger_text(hover))
+            continue
+        menu = {"triggers": [_trigger_text(hover)], "revealed_links": [_link(l, base, style) for l in links]}
+        by_links[key] = menu
+        menus.append(menu)
+    return menus
+
+
+def _compact_result(result: dict, base: str, style: str) -> dict:
+    compact = {"type": result["type"]}
+    for key, value in result.items():
+        if key == "type" or value in (None, [], ""):
+            continue
+        if key == "target_url":
+            value = relative_url(value, base)
+        elif key == "nested_links":
+            value = [_link(l, base, style) for l in value]
+        elif key == "actions":
+            value = [
+                {k: relative_url(v, base) if k == "target_url" else v for k, v in action.items() if v is not None}
+                for action in value
+            ]
+        compact[key] = value
+    return compact
+
+
+def compact_clicks(clicks: list, base: str, style: str) -> list:
+    """Click interactions without the ones that had no visible effect."""
+    return [
+        {"trigger": _trigger_text(click), "result": _compact_result(click["result"], base, style)}
+        for click in clicks
+        if click["result"]["type"] != "none"
+    ]
+
+
+def compact_scan(scan: dict, style: str = DEFAULT_PROMPT_STYLE) -> dict:
+    """
+    Scan data reduced to what the LLM needs to write scenarios: scan
+    metadata, selector hints and timings are dropped, same-origin URLs are
+    written relative to "url_base" and duplicate menus are merged. The
+    "json" style returns the scan unchanged.
+    """
+    if style == "json":
+        return scan
+    base = origin_of(scan.get("page_url"))
+    compact = {"page_url": scan.get("page_url"), "url_base": base}
+    if scan.get("hover_interactions"):
+        compact["hover_interactions"] = compact_hovers(scan["hover_interactions"], base, style)
+    if scan.get("click_interactions"):
+        compact["click_interactions"] = compact_clicks(scan["click_interactions"], base, style)
+    return compact
+
+
+# ==========================
+# SERIALIZATION
+# ==========================
+
+def encode(data, style: str = DEFAULT_PROMPT_STYLE) -> str:
+    """Serialize (compacted) scan data for the prompt."""
+    if style == "json":
+        return json.dumps(data, indent=2)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def format_notes(style: str) -> str:
+    """How to read the compact encoding, for the user message."""
+    if style == "json":
+        return ""
+    notes = [
+        'URLs starting with "/" are relative to "url_base"; always write them out in full.',
+        'Each hover entry lists every trigger that opens the same menu in "triggers".',
+    ]
+    if style == "table":
+        notes.append("Links are [text, url] pairs.")
+    return "\n".join(notes)
+
+
+def token_report(scan: dict) -> dict:
+    """Estimated prompt tokens of the scan in each style."""
+    return {style: estimate_tokens(encode(compact_scan(scan, style), style)) for style in PROMPT_STYLES}
+
+
+# ==========================
+# ENTRY POINT
+# ==========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report the prompt size of a scan in each encoding style.")
+    parser.add_argument("scan_json", nargs="?", default="data/homepage_interactions.json")
+    parser.add_argument("--show", choices=PROMPT_STYLES, help="also print the encoded scan in this style")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    with open(args.scan_json, "r", encoding="utf-8") as f:
+        scan = json.load(f)
+
+    report = token_report(scan)
+    for style, tokens in report.items():
+        saved = 1 - tokens / report["json"] if report["json"] else 0
+        print(f"{style:>5}: ~{tokens} tokens ({saved:.0%} fewer than json)")
+    if args.show:
+        print(encode(compact_scan(scan, args.show), args.show))
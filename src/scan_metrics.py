@@ -0,0 +1,234 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# ==========================
+# CONFIG
+# ==========================
+
+TOP_ROUND_TRIP_METHODS = 15   # protocol methods listed in the metrics block
+
+_local = threading.local()    # .metrics, .depth, .round_trips of the current thread
+_PATCH_LOCK = threading.Lock()
+_PATCHED = False
+
+
+# ==========================
+# RECORDER
+# ==========================
+
+class ScanMetrics:
+    """
+    Spans, counters and Playwright round trips of one scan.
+
+    A recorder is made current for a thread with activate(); span(),
+    count() and @traced then record into it, and every protocol message
+    that thread sends to the Playwright driver is counted as a round trip
+    (attributed to the spans open at the time). Click-worker threads
+    activate the scan's recorder themselves, so one recorder collects the
+    whole scan.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.root_thread = threading.get_ident()
+        self.spans = []          # (name, start s, duration s, thread id, depth, round trips, args)
+        self.counters = {}
+        self.round_trips = {}    # protocol method -> count
+        self._threads = {}       # thread id -> name, for the trace
+        self._lock = threading.Lock()
+        install_round_trip_counter()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        depth = getattr(_local, "depth", 0)
+        trips = getattr(_local, "round_trips", 0)
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            _local.depth = depth
+            tid = threading.get_ident()
+            with self._lock:
+                self._threads.setdefault(tid, threading.current_thread().name)
+                self.spans.append((name, start - self.started, duration, tid, depth,
+                                   getattr(_local, "round_trips", 0) - trips, args))
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def round_trip(self, method: str) -> None:
+        _local.round_trips = getattr(_local, "round_trips", 0) + 1
+        with self._lock:
+            self.round_trips[method] = self.round_trips.get(method, 0) + 1
+
+    # ---- reporting ----
+
+    def summary(self) -> dict:
+        """
+        The "metrics" block of a scan: wall time, the top-level phases of the
+        scan in order, every span name aggregated over all threads (so nested
+        and parallel spans can add up to more than the wall time), round
+        trips by protocol method and the counters.
+        """
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+            round_trips = dict(self.round_trips)
+
+        phases = [
+            {"name": name, "ms": round(duration * 1000), "round_trips": trips, **args}
+            for name, start, duration, tid, depth, trips, args in sorted(spans, key=lambda s: s[1])
+            if depth == 0 and tid == self.root_thread
+        ]
+        by_name = {}
+        for name, start, duration, tid, depth, trips, args in spans:
+            entry = by_name.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "round_trips": 0})
+            entry["count"] += 1
+            entry["total_ms"] += duration * 1000
+            entry["max_ms"] = max(entry["max_ms"], duration * 1000)
+            entry["round_trips"] += trips
+        for entry in by_name.values():
+            entry["total_ms"] = round(entry["total_ms"])
+            entry["max_ms"] = round(entry["max_ms"])
+
+        top = sorted(round_trips.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000),
+            "phases": phases,
+            "spans": dict(sorted(by_name.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+            "round_trips": {
+                "total": sum(round_trips.values()),
+                "by_method": dict(top[:TOP_ROUND_TRIP_METHODS]),
+            },
+            "counters": counters,
+        }
+
+    def trace_events(self, label: str = "scan") -> list:
+        """Spans as Chrome trace "complete" events (times in microseconds)."""
+        with self._lock:
+            spans = list(self.spans)
+            threads = dict(self._threads)
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        events += [
+            {
+                "name": name, "cat": label, "ph": "X", "pid": 1, "tid": tid,
+                "ts": round(start * 1e6), "dur": round(duration * 1e6),
+                "args": {"round_trips": trips, **args},
+            }
+            for name, start, duration, tid, depth, trips, args in spans
+        ]
+        return events
+
+    def write_trace(self, path: str, label: str = "scan") -> None:
+        """
+        Write the spans to `path`: a Chrome trace (chrome://tracing, Perfetto)
+        for ".json", otherwise one JSON object per line.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        events = self.trace_events(label)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+            else:
+                for event in events:
+                    if event["ph"] == "X":
+                        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+# ==========================
+# CURRENT RECORDER
+# ==========================
+
+def current() -> ScanMetrics | None:
+    return getattr(_local, "metrics", None)
+
+
+@contextmanager
+def activate(metrics: ScanMetrics | None):
+    """Make `metrics` the recorder of the calling thread for the duration of the block."""
+    previous = current()
+    _local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = previous
+
+
+def span(name: str, **args):
+    """Span on the current recorder (a no-op without one)."""
+    metrics = current()
+    return metrics.span(name, **args) if metrics is not None else nullcontext()
+
+
+def count(name: str, n: int = 1) -> None:
+    metrics = current()
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def traced(name: str, label: str | None = None):
+    """
+    Decorator recording every call as a `name` span; `label` names an
+    argument whose value is stored with the span (e.g. the trigger text).
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = current()
+            if metrics is None:
+                return fn(*args, **kwargs)
+            span_args = {}
+            if label:
+                span_args[label] = signature.bind_partial(*args, **kwargs).arguments.get(label)
+            with metrics.span(name, **span_args):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ==========================
+# ROUND TRIPS
+# ==========================
+
+def install_round_trip_counter() -> bool:
+    """
+    Count every message the sync API sends to the Playwright driver against
+    the sending thread's recorder. The sync API runs its event loop on the
+    calling thread, so the thread-local recorder is the right one. This hooks
+    a private Playwright method; if it is missing, round trips are simply
+    not counted.
+    """
+    global _PATCHED
+    with _PATCH_LOCK:
+        if _PATCHED:
+            return True
+        try:
+            from playwright._impl._connection import Connection
+            original = Connection._send_message_to_server
+        except (ImportError, AttributeError):
+            return False
+
+        @functools.wraps(original)
+        def send_message_to_server(self, object, method, *args, **kwargs):
+            metrics = current()
+            if metrics is not None:
+                metrics.round_trip(method)
+            return original(self, object, method, *args, **kwargs)
+
+        Connection._send_message_to_server = send_message_to_server
+        _PATCHED = True
+        return True
@@ -0,0 +1,59 @@
+import copy
+import threading
+
+# ==========================
+# CONFIG
+# ==========================
+
+# Click results that mean the same thing on every page sharing the component.
+# navigate_internal / scroll results are relative to the page they ran on.
+REUSABLE_CLICK_TYPES = {"navigate", "popup", "none"}
+
+
+# ==========================
+# TEMPLATE INDEX
+# ==========================
+
+class TemplateIndex:
+    """
+    Results of interactions inside shared page components (header, nav,
+    footer), keyed by the component's structural fingerprint and the
+    trigger label. The fingerprint is computed in-page from the component's
+    tag skeleton and href set (see playwright_interactions), so a later page
+    carrying the same component can reuse the results instead of hovering or
+    clicking those triggers again. Safe to share across crawl workers.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (kind, component, label) -> result (None = nothing found)
+        self._lock = threading.Lock()
+        self.hits = {"hover": 0, "click": 0}
+        self.misses = {"hover": 0, "click": 0}
+
+    def lookup(self, kind: str, component: str | None, label: str):
+        """
+        (True, result copy) if this trigger was already analyzed inside an
+        identical component, otherwise (False, None). The result itself may
+        be None when the earlier analysis found nothing.
+        """
+        if not component:
+            return False, None
+        key = (kind, component, label)
+        with self._lock:
+            if key not in self._entries:
+                self.misses[kind] += 1
+                return False, None
+            self.hits[kind] += 1
+            return True, copy.deepcopy(self._entries[key])
+
+    def record(self, kind: str, component: str | None, label: str, result: dict | None) -> None:
+        if not component:
+            return
+        if kind == "click" and (result is None or result["result"]["type"] not in REUSABLE_CLICK_TYPES):
+            return
+        with self._lock:
+            self._entries[(kind, component, label)] = copy.deepcopy(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": dict(self.hits), "misses": dict(self.misses)}
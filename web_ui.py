@@ -1,9 +1,23 @@
 import streamlit as st
-import subprocess
 import os
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from browser_pool import get_pool
+from generate_gherkin_with_ai import (
+    DEFAULT_ENGINE,
+    ENGINES,
+    FEATURE_OUTPUT_PATH,
+    generate_from_scan,
+)
+from pipeline import save_scan, scan_page
+
+FEATURE_PATH = FEATURE_OUTPUT_PATH
+PROMPT_PATH = "system_prompts/gherkin_prompt.md"
+SCAN_TIMEOUT = 300  # seconds
+
 # Page configuration
 st.set_page_config(
     page_title="Gherkin Test Generator",
@@ -146,6 +160,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Long-lived resources shared by every session and rerun (the Groq client
+# is kept per API key by generate_gherkin_with_ai.get_client)
+@st.cache_resource
+def get_browser_pool():
+    return get_pool()
+
 # Header
 st.markdown('<h1 class="main-title">🧪 AI-Powered Gherkin Test Generator</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Generate BDD test scenarios automatically from any website</p>', unsafe_allow_html=True)
@@ -164,6 +184,18 @@ with col2:
         label_visibility="collapsed"
     )
     
+    refresh_scan = st.checkbox(
+        "Force a new scan",
+        help="Ignore the cached scan of this URL and scan the page again"
+    )
+    
+    engine = st.selectbox(
+        "Scenario engine",
+        ENGINES,
+        index=ENGINES.index(DEFAULT_ENGINE),
+        help="rules: local templates only, llm: everything through the AI model, hybrid: templates + AI for the rest"
+    )
+
     # Generate button
     generate_btn = st.button("🚀 Generate Gherkin Tests", type="primary", use_container_width=True)
 
@@ -183,40 +215,56 @@ if generate_btn:
         progress_bar.progress(25)
         
         try:
-            result = subprocess.run(
-                ["python", "src/playwright_interactions.py", url_input],
-                capture_output=True,
-                text=True,
-                timeout=120
+            scan_data = scan_page(
+                url_input,
+                refresh=refresh_scan,
+                browser_pool=get_browser_pool(),
+                timeout=SCAN_TIMEOUT
             )
+            save_scan(scan_data)
             
             progress_bar.progress(50)
             
-            if result.returncode != 0:
-                st.markdown('<div class="error-box">❌ Scanning failed. Please check the URL and try again.</div>', unsafe_allow_html=True)
-                if result.stderr:
-                    with st.expander("View Error Details"):
-                        st.code(result.stderr)
-                st.stop()
-            
             st.markdown('<div class="success-box">✅ Website scan completed successfully!</div>', unsafe_allow_html=True)
             
             # Display scan results
             with st.expander("📊 View Scan Results (JSON)"):
-                if os.path.exists("scan_results.json"):
-                    with open("scan_results.json", "r", encoding="utf-8") as f:
-                        scan_data = json.load(f)
-                    
-                    # Show summary
-                    col_a, col_b = st.columns(2)
+                # Show summary
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.metric("Hover Interactions", len(scan_data.get("hover_interactions", [])))
+                with col_b:
+                    st.metric("Click Interactions", len(scan_data.get("click_interactions", [])))
+                
+                st.json(scan_data)
+
+            budget = scan_data.get("budget", {})
+            if budget.get("partial"):
+                skipped = sum(p["skipped"] for p in budget["phases"].values())
+                st.warning(f"⚠️ Scan hit its time budget: partial results, {skipped} element(s) not tested")
+
+            # Per-phase timing recorded by the scanner
+            metrics = scan_data.get("metrics")
+            if metrics:
+                with st.expander("⏱️ Scan Timing Breakdown"):
+                    counters = metrics.get("counters", {})
+                    col_a, col_b, col_c = st.columns(3)
                     with col_a:
-                        st.metric("Hover Interactions", len(scan_data.get("hover_interactions", [])))
+                        st.metric("Scan Time", f"{metrics['total_ms'] / 1000:.1f}s")
                     with col_b:
-                        st.metric("Popup Interactions", len(scan_data.get("popup_interactions", [])))
-                    
-                    st.json(scan_data)
-            
-        except subprocess.TimeoutExpired:
+                        st.metric("Playwright Round Trips", metrics["round_trips"]["total"])
+                    with col_c:
+                        st.metric("Browser Contexts", counters.get("contexts", 0))
+
+                    st.markdown("**Phases** (in order)")
+                    st.bar_chart({p["name"] + (f" ({p['step']})" if p.get("step") else ""): p["ms"] for p in metrics["phases"]})
+                    st.markdown("**All spans** (summed over click workers)")
+                    st.dataframe(
+                        [{"span": name, **entry} for name, entry in metrics["spans"].items()],
+                        use_container_width=True
+                    )
+
+        except TimeoutError:
             st.markdown('<div class="error-box">❌ Scan timed out. The website might be too large or slow to respond.</div>', unsafe_allow_html=True)
             st.stop()
         except Exception as e:
@@ -224,24 +272,23 @@ if generate_btn:
             st.stop()
         
         # Step 2: Generate Gherkin
-        status_text.text("🤖 Step 2/2: Generating Gherkin scenarios with AI...")
+        status_text.text("🤖 Step 2/2: Generating Gherkin scenarios...")
         progress_bar.progress(75)
         
         try:
-            result = subprocess.run(
-                ["python", "src/generate_gherkin_with_ai.py"],
-                capture_output=True,
-                text=True,
-                timeout=60
+            # Scenarios are streamed; show them as they arrive
+            live_output = st.empty()
+            feature_content = generate_from_scan(
+                scan_data,
+                engine=engine,
+                on_update=lambda text: live_output.code(text, language="gherkin")
             )
+            live_output.empty()
             
             progress_bar.progress(100)
             
-            if result.returncode != 0:
+            if not feature_content:
                 st.markdown('<div class="error-box">❌ Generation failed. Please check your API key in .env file.</div>', unsafe_allow_html=True)
-                if result.stderr:
-                    with st.expander("View Error Details"):
-                        st.code(result.stderr)
                 st.stop()
             
             status_text.empty()
@@ -255,8 +302,8 @@ if generate_btn:
 # Display generated feature file
 st.markdown('<div class="section-header">📝 Generated Test Scenarios</div>', unsafe_allow_html=True)
 
-if os.path.exists("outputs/ai_generated_scenarios.feature"):
-    with open("outputs/ai_generated_scenarios.feature", "r", encoding="utf-8") as f:
+if os.path.exists(FEATURE_PATH):
+    with open(FEATURE_PATH, "r", encoding="utf-8") as f:
         feature_content = f.read()
     
     # Display in a code block with line numbers
@@ -325,7 +372,7 @@ with st.sidebar:
     
     # Check configuration status
     env_exists = os.path.exists(".env")
-    prompt_exists = os.path.exists("Gherkin_Prompt.md")
+    prompt_exists = os.path.exists(PROMPT_PATH)
     
     if env_exists:
         st.success("✅ API Key configured")
@@ -335,7 +382,13 @@ with st.sidebar:
     if prompt_exists:
         st.success("✅ Prompt template found")
     else:
-        st.error("❌ Gherkin_Prompt.md not found")
+        st.error(f"❌ {PROMPT_PATH} not found")
+    
+    pool_stats = get_browser_pool().stats()
+    if pool_stats["healthy"]:
+        st.success(f"✅ Browser pool: {pool_stats['size'] - pool_stats['busy']}/{pool_stats['size']} warm browsers free")
+    else:
+        st.warning("⚠️ Browser pool is starting or unhealthy")
     
     st.markdown("---")
     